@@ -1,6 +1,4 @@
 import sys
-import sqlite3
-from pathlib import Path
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import (
     QWidget, QPushButton, QListWidget, QLabel, QMessageBox,
@@ -9,52 +7,10 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QSize
 
-DB_NAME = "cafe.db"
-
-
-# =========================================================
-# =============== DATABASE AUTO CREATION ===================
-# =========================================================
-def init_database():
-    """Create the database and tables if they do not exist."""
-    db_path = Path(DB_NAME)
-    create_new = not db_path.exists()
-
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # Create tables
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        price REAL NOT NULL
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        total REAL NOT NULL,
-        date TEXT NOT NULL
-    )
-    """)
-
-    # Insert sample products if DB was new
-    if create_new:
-        cursor.executemany(
-            "INSERT INTO products (name, price) VALUES (?, ?)",
-            [
-                ("Café", 10),
-                ("Thé", 8),
-                ("Jus d'orange", 12),
-                ("Cappuccino", 14),
-                ("Eau Minérale", 5),
-            ]
-        )
-
-    conn.commit()
-    conn.close()
+from cart import Cart
+from database import get_conn, init_db
+from models import create_order
+from money import Money
 
 
 # =========================================================
@@ -66,8 +22,7 @@ class MiniPOS(QWidget):
         self.setWindowTitle("Caisse Café")
         self.resize(800, 500)
 
-        self.cart = {}  # {product_name: [price, qty]}
-        self.total = 0.0
+        self.cart = Cart()
 
         main_layout = QHBoxLayout()
 
@@ -91,15 +46,15 @@ class MiniPOS(QWidget):
         products_box = QGroupBox("Produits")
         products_layout = QVBoxLayout()
 
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, price FROM products")
-        products = cursor.fetchall()
-        conn.close()
+        cursor = get_conn().cursor()
+        cursor.execute("SELECT id, name, price_cents FROM products ORDER BY name")
+        products = [(pid, name, Money(cents)) for pid, name, cents in cursor.fetchall()]
 
-        for name, price in products:
+        for pid, name, price in products:
             btn = QPushButton(f"{name} - {price} DH")
-            btn.clicked.connect(lambda checked, n=name, p=price: self.add_to_cart(n, p))
+            btn.clicked.connect(
+                lambda checked, i=pid, n=name, p=price: self.add_to_cart(i, n, p)
+            )
             products_layout.addWidget(btn)
 
         products_box.setLayout(products_layout)
@@ -127,63 +82,46 @@ class MiniPOS(QWidget):
     # ======================================================
     # ================== CART SYSTEM =======================
     # ======================================================
-    def add_to_cart(self, name, price):
+    def add_to_cart(self, product_id, name, price):
         """Add product or increase quantity"""
-        if name in self.cart:
-            self.cart[name][1] += 1
-        else:
-            self.cart[name] = [price, 1]
-
+        self.cart.add(product_id, name, price)
         self.refresh_cart()
 
-    def remove_item(self, item_name):
+    def remove_item(self, product_id):
         """Remove one quantity"""
-        if self.cart[item_name][1] > 1:
-            self.cart[item_name][1] -= 1
-        else:
-            del self.cart[item_name]
+        self.cart.decrement(product_id)
         self.refresh_cart()
 
     def refresh_cart(self):
         """Refresh the display of cart"""
         self.cart_list.clear()
-        self.total = 0
-
-        for name, (price, qty) in self.cart.items():
-            total_line = price * qty
-            self.total += total_line
 
-            item = QListWidgetItem(f"{name} - {price} DH x{qty}")
+        for line in self.cart:
+            item = QListWidgetItem(f"{line.name} - {line.price} DH x{line.qty}")
             self.cart_list.addItem(item)
 
             # Button X on each line
             btn = QPushButton("❌")
-            btn.clicked.connect(lambda checked, n=name: self.remove_item(n))
+            btn.clicked.connect(lambda checked, i=line.product_id: self.remove_item(i))
             self.cart_list.setItemWidget(item, btn)
 
-        self.total_label.setText(f"Total : {self.total} DH")
+        self.total_label.setText(f"Total : {self.cart.total} DH")
 
     # ======================================================
     # ==================== PAYMENT ==========================
     # ======================================================
     def pay(self):
-        if self.total <= 0:
+        if not self.cart:
             QMessageBox.warning(self, "Erreur", "Le panier est vide.")
             return
 
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO sales (total, date) VALUES (?, datetime('now'))",
-            (self.total,)
-        )
-        conn.commit()
-        conn.close()
+        # Commande sans serveur (montants en centimes) via models.py
+        order = create_order(None, self.cart)
 
-        QMessageBox.information(self, "Succès", f"Paiement effectué : {self.total} DH")
+        QMessageBox.information(self, "Succès", f"Paiement effectué : {order['total']} DH")
 
         # Clear cart
-        self.cart = {}
+        self.cart = Cart()
         self.refresh_cart()
 
 
@@ -191,7 +129,7 @@ class MiniPOS(QWidget):
 # ===================== MAIN ==============================
 # =========================================================
 def main():
-    init_database()  # AUTO database creation
+    init_db()  # création / mise à jour de cafe.db
     app = QtWidgets.QApplication(sys.argv)
     window = MiniPOS()
     window.show()
@@ -0,0 +1 @@
+"""Mesures de performance de la couche de données (hors interface graphique)."""
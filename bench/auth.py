@@ -0,0 +1,93 @@
+"""Coût du hachage des mots de passe selon le nombre d'itérations PBKDF2.
+
+À lancer sur le matériel de la caisse : indique le plus grand nombre
+d'itérations dont la vérification reste sous la cible de latence, à reporter
+dans CAFE_PASSWORD_ITERATIONS. Mesure aussi une connexion complète
+(authenticate_user) et un changement de serveur par code PIN
+(authenticate_pin), avec et sans le cache des vérifications réussies.
+
+Usage : python -m bench.auth [--target MS] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+import database
+import models
+from utils import auth
+
+ITERATIONS = [50_000, 100_000, 200_000, 300_000, 400_000, 600_000, 800_000]
+
+
+def _median_ms(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(target: float, repeat: int, iterations: List[int]) -> None:
+    print(f"PBKDF2-SHA256, cible {target:.0f} ms par vérification")
+    print(f"{'itérations':>11} {'ms':>8}")
+    best = None
+    for n in iterations:
+        stored = auth.hash_password("1234", iterations=n)
+        ms = _median_ms(
+            lambda: (auth.clear_verified_cache(), auth.verify_password("1234", stored)),
+            repeat,
+        )
+        mark = ""
+        if ms <= target:
+            best = n
+            mark = " ok"
+        print(f"{n:>11} {ms:>8.1f}{mark}")
+    if best is None:
+        print(f"Aucun réglage sous {target:.0f} ms : garder le plus petit essayé.")
+    else:
+        print(f"Recommandé : {auth.ITERATIONS_ENV}={best}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        models.create_server("bench", "0000")
+        auth.clear_verified_cache()
+        cold = _median_ms(
+            lambda: (auth.clear_verified_cache(), models.authenticate_user("bench", "0000")),
+            repeat,
+        )
+        cached = _median_ms(lambda: models.authenticate_user("bench", "0000"), repeat * 50)
+        user_id = models.create_server("bench-pin", "0000")
+        models.set_user_pin(user_id, "4321")
+        pin_cold = _median_ms(
+            lambda: (auth.clear_verified_cache(), models.authenticate_pin(user_id, "4321")),
+            repeat,
+        )
+        pin_cached = _median_ms(lambda: models.authenticate_pin(user_id, "4321"), repeat * 50)
+        database.close_conn()
+    print(f"authenticate_user ({auth.password_iterations()} itérations)")
+    print(f"  sans cache : {cold:8.2f} ms")
+    print(f"  avec cache : {cached:8.3f} ms")
+    print(f"authenticate_pin ({auth.PIN_ITERATIONS} itérations, changement de serveur)")
+    print(f"  sans cache : {pin_cold:8.2f} ms")
+    print(f"  avec cache : {pin_cached:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", type=float, default=250.0, help="latence visée en ms")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--iterations", default=",".join(str(n) for n in ITERATIONS),
+        help="nombres d'itérations à essayer",
+    )
+    args = parser.parse_args()
+    run(args.target, args.repeat, [int(n) for n in args.iterations.split(",")])
+
+
+if __name__ == "__main__":
+    main()
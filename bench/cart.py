@@ -0,0 +1,38 @@
+"""Coût des opérations du panier (sans Qt) selon la taille de la commande.
+
+Usage : python -m bench.cart [--lines N] [--ops N]
+"""
+import argparse
+import time
+
+from cart import Cart
+from money import Money
+
+
+def run(lines: int, ops: int) -> None:
+    price = Money(1250)
+    cart = Cart()
+    for pid in range(lines):
+        cart.add(pid, f"Produit {pid}", price)
+
+    start = time.perf_counter()
+    for i in range(ops):
+        pid = i % lines
+        cart.add(pid, f"Produit {pid}", price)
+        cart.decrement(pid)
+        cart.total_cents
+    elapsed = time.perf_counter() - start
+
+    print(f"Panier de {lines} lignes : {2 * ops / elapsed:10.0f} opérations/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=30)
+    parser.add_argument("--ops", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.lines, args.ops)
+
+
+if __name__ == "__main__":
+    main()
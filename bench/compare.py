@@ -0,0 +1,52 @@
+"""Compare deux résultats de `python -m bench.suite -o …`.
+
+Une mesure est signalée comme régression quand sa médiane (p50) augmente
+de plus de --threshold pour cent ; le code de sortie vaut alors 1.
+
+Usage : python -m bench.compare avant.json apres.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    threshold: float,
+) -> List[str]:
+    """Affiche l'évolution de chaque mesure ; renvoie les noms en régression."""
+    regressions = []
+    print(f"  {'fonction':<26} {'p50 avant':>10} {'p50 après':>10} {'écart':>8}")
+    for name in before:
+        if name not in after:
+            print(f"  {name:<26} absente du second résultat")
+            continue
+        old, new = before[name]["p50_ms"], after[name]["p50_ms"]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  RÉGRESSION"
+        print(f"  {name:<26} {old:10.3f} {new:10.3f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="en pour cent")
+    args = parser.parse_args()
+    if compare(_load(args.before), _load(args.after), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare l'ancienne connexion par appel à la connexion partagée par thread.
+
+Usage : python -m bench.connections [--ops N]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Callable
+
+import database
+import models
+
+
+def _legacy_get_conn() -> sqlite3.Connection:
+    # Comportement d'origine : nouvelle connexion, fermée après chaque requête.
+    return sqlite3.connect(database.DB_NAME)
+
+
+def _legacy_get_products_by_category(category_id: int) -> list:
+    conn = _legacy_get_conn()
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, name, price_cents FROM products WHERE category_id=? ORDER BY name",
+        (category_id,),
+    )
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+def _ops_per_sec(fn: Callable[[], object], ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return ops / (time.perf_counter() - start)
+
+
+def run(ops: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        category_id = models.get_categories()[0]["id"]
+
+        before = _ops_per_sec(lambda: _legacy_get_products_by_category(category_id), ops)
+        after = _ops_per_sec(lambda: models.get_products_by_category(category_id), ops)
+        database.close_conn()
+
+    print(f"get_products_by_category x{ops}")
+    print(f"  avant (connexion par appel) : {before:10.0f} ops/s")
+    print(f"  après (connexion partagée)  : {after:10.0f} ops/s")
+    print(f"  gain                        : x{after / before:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Vérifie les compteurs de instrumentation.py et mesure le coût des enveloppes.
+
+N appels à une fonction de lecture doivent donner N appels et N requêtes ;
+un enregistrement de commande ne doit pas compter les instructions des
+triggers. Le programme se termine avec le code 1 si un compteur est faux.
+
+Usage : python -m bench.instrument [--calls N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import database
+import instrumentation
+import models
+from cart import Cart
+from money import Money
+
+
+def _ops_per_sec(fn: Callable[[], object], ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return ops / (time.perf_counter() - start)
+
+
+def _check(calls: int, serveur_id: int, product_id: int) -> List[str]:
+    """Appelle chaque fonction `calls` fois et renvoie les compteurs faux."""
+    cart = Cart()
+    cart.add(product_id, "produit", Money(1000), 2)
+    # (nom, fonction, requêtes attendues par appel). Une commande : BEGIN,
+    # INSERT de la commande, INSERT des lignes, COMMIT ; les instructions des
+    # triggers des totaux ne s'y ajoutent pas.
+    cases: List[Tuple[str, Callable[[], object], int]] = [
+        ("models.get_categories", models.get_categories, 1),
+        ("models.get_order_items", lambda: models.get_order_items(1), 1),
+        ("models.create_order", lambda: models.create_order(serveur_id, cart), 4),
+    ]
+    instrumentation.reset()
+    for _, fn, _ in cases:
+        for _ in range(calls):
+            fn()
+    stats: Dict[str, Dict] = {s["name"]: s for s in instrumentation.snapshot()}
+    errors = []
+    for name, _, per_call in cases:
+        s = stats.get(name, {"calls": 0, "queries": 0})
+        print(f"  {name:<28} appels {s['calls']:>6}  requêtes {s['queries']:>6}")
+        if s["calls"] != calls:
+            errors.append(f"{name} : {s['calls']} appels au lieu de {calls}")
+        if s["queries"] != calls * per_call:
+            errors.append(
+                f"{name} : {s['queries']} requêtes au lieu de {calls * per_call}"
+            )
+    return errors
+
+
+def run(calls: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        serveur_id = models.create_server("mesure", "0000")
+        category_id = models.get_categories()[0]["id"]
+        product_id = models.get_products_by_category(category_id)[0]["id"]
+
+        before = _ops_per_sec(models.get_categories, calls)
+        instrumentation.install(tickets=False)
+        after = _ops_per_sec(models.get_categories, calls)
+        print(f"get_categories x{calls}")
+        print(f"  sans instrumentation : {before:10.0f} ops/s")
+        print(f"  avec instrumentation : {after:10.0f} ops/s")
+
+        print("Compteurs")
+        errors = _check(calls, serveur_id, product_id)
+        database.close_conn()
+
+    for error in errors:
+        print(f"ERREUR {error}")
+    return 1 if errors else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    sys.exit(run(args.calls))
+
+
+if __name__ == "__main__":
+    main()
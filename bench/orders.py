@@ -0,0 +1,46 @@
+"""Débit d'insertion des commandes : une par une ou en lot.
+
+Usage : python -m bench.orders [--orders N] [--batch N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import database
+import models
+from bench.seed import random_orders
+
+
+def run(count: int, batch: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        orders = random_orders(count, days=1)
+
+        start = time.perf_counter()
+        for o in orders:
+            models.create_order(o["serveur_id"], o["cart"], o["date"])
+        single = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for offset in range(0, count, batch):
+            models.create_orders(orders[offset:offset + batch])
+        bulk = count / (time.perf_counter() - start)
+        database.close_conn()
+
+    print(f"{count} commandes")
+    print(f"  create_order, une transaction chacune : {single:10.0f} commandes/s")
+    print(f"  create_orders, lots de {batch:<14} : {bulk:10.0f} commandes/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.orders, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Rapport d'une journée sur une année de ventes synthétiques.
+
+Compare le filtre d'origine `date(o.date) BETWEEN ? AND ?` (non indexable)
+à la requête actuelle de models.get_orders_between_dates, puis le total d'un
+mois calculé sur les commandes brutes ou lu dans les totaux journaliers.
+
+Usage : python -m bench.reports [--orders N] [--repeat N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+import database
+import models
+from bench.seed import seed_orders
+
+LEGACY_QUERY = """
+    SELECT o.id, o.total_cents, o.date, u.username
+    FROM orders o
+    JOIN users u ON o.serveur_id = u.id
+    WHERE date(o.date) BETWEEN ? AND ?
+    ORDER BY o.date
+"""
+
+
+def _best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(orders: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        end = datetime.now()
+        seed_orders(orders, days=365, end=end)
+        day = (end - timedelta(days=30)).strftime("%Y-%m-%d")
+        conn = database.get_conn()
+
+        before = _best_ms(lambda: conn.execute(LEGACY_QUERY, (day, day)).fetchall(), repeat)
+        after = _best_ms(lambda: models.get_orders_between_dates(day, day), repeat)
+        found = len(models.get_orders_between_dates(day, day))
+
+        month_start = (end - timedelta(days=60)).strftime("%Y-%m-%d")
+        month_end = (end - timedelta(days=31)).strftime("%Y-%m-%d")
+        raw = _best_ms(
+            lambda: sum(o["total"] for o in models.get_orders_between_dates(month_start, month_end)),
+            repeat,
+        )
+        summary = _best_ms(lambda: models.get_sales_summary(month_start, month_end), repeat)
+        database.close_conn()
+
+    print(f"Rapport du {day} ({found} commandes sur {orders})")
+    print(f"  avant (date(o.date) BETWEEN) : {before:9.2f} ms")
+    print(f"  après (plage sur o.date)     : {after:9.2f} ms")
+    print(f"Total du {month_start} au {month_end}")
+    print(f"  commandes brutes             : {raw:9.2f} ms")
+    print(f"  totaux journaliers           : {summary:9.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.orders, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
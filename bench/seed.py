@@ -0,0 +1,119 @@
+"""Génération de données de ventes synthétiques pour les mesures.
+
+Les commandes suivent la journée d'un café : pointes du matin, du midi et
+du soir, calme l'après-midi. Elles sont produites jour après jour, dans
+l'ordre chronologique, pour pouvoir en insérer des millions sans tout
+garder en mémoire.
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+import database
+import models
+from cart import Cart
+from money import Money
+
+# Poids relatifs des heures d'ouverture (7 h - 23 h).
+HOUR_WEIGHTS = {
+    7: 6, 8: 10, 9: 8, 10: 5, 11: 5, 12: 9, 13: 10, 14: 6,
+    15: 4, 16: 4, 17: 5, 18: 6, 19: 7, 20: 6, 21: 4, 22: 2, 23: 1,
+}
+
+
+def seed_catalog(
+    servers: int = 0,
+    categories: int = 0,
+    products: int = 0,
+    seed: int = 0,
+) -> None:
+    """Ajoute des serveurs, catégories et produits synthétiques aux données de départ.
+
+    Les serveurs s'appellent serveur1, serveur2… avec le mot de passe "0001",
+    "0002"… ; les produits sont répartis au hasard entre toutes les catégories.
+    """
+    rng = random.Random(seed)
+    for i in range(1, servers + 1):
+        models.create_server(f"serveur{i}", f"{i:04d}")
+    with database.transaction(immediate=True) as conn:
+        conn.executemany(
+            "INSERT INTO categories (name) VALUES (?)",
+            [(f"Catégorie {i}",) for i in range(1, categories + 1)],
+        )
+        category_ids = [r[0] for r in conn.execute("SELECT id FROM categories")]
+        conn.executemany(
+            "INSERT INTO products (name, price_cents, category_id) VALUES (?, ?, ?)",
+            [
+                (f"Produit {i}", rng.randrange(500, 6000, 50), rng.choice(category_ids))
+                for i in range(1, products + 1)
+            ],
+        )
+    models.invalidate_catalog()
+
+
+def iter_random_orders(
+    count: int,
+    days: int = 365,
+    end: Optional[datetime] = None,
+    max_lines: int = 4,
+    seed: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """Commandes prêtes pour models.create_orders, sur les `days` jours finissant à `end`."""
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    first_day = end.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+        days=days - 1
+    )
+    conn = database.get_conn()
+    servers = [r[0] for r in conn.execute("SELECT id FROM users")]
+    products = [
+        (pid, name, Money(cents))
+        for pid, name, cents in conn.execute("SELECT id, name, price_cents FROM products")
+    ]
+    hours = list(HOUR_WEIGHTS)
+    weights = list(HOUR_WEIGHTS.values())
+    per_day, extra = divmod(count, days)
+    for d in range(days):
+        day = first_day + timedelta(days=d)
+        n = per_day + (1 if d < extra else 0)
+        seconds = sorted(
+            h * 3600 + rng.randrange(3600) for h in rng.choices(hours, weights, k=n)
+        )
+        for s in seconds:
+            lines = rng.sample(products, rng.randint(1, min(max_lines, len(products))))
+            cart = Cart()
+            for pid, name, price in lines:
+                cart.add(pid, name, price, qty=rng.randint(1, 3))
+            yield {
+                "serveur_id": rng.choice(servers),
+                "cart": cart,
+                "date": (day + timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+
+
+def random_orders(
+    count: int,
+    days: int = 365,
+    end: Optional[datetime] = None,
+    max_lines: int = 4,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    return list(iter_random_orders(count, days, end, max_lines, seed))
+
+
+def seed_orders(
+    count: int,
+    days: int = 365,
+    end: Optional[datetime] = None,
+    max_lines: int = 4,
+    seed: int = 0,
+    batch: int = 10000,
+) -> None:
+    """Insère `count` commandes réparties sur les `days` derniers jours, par lots."""
+    orders = iter_random_orders(count, days, end, max_lines, seed)
+    while True:
+        chunk = list(islice(orders, batch))
+        if not chunk:
+            return
+        models.create_orders(chunk)
@@ -0,0 +1,99 @@
+"""Temps de démarrage : imports des modules et init_db sur une base à jour.
+
+Chaque mesure est faite dans un nouveau processus Python (imports à froid,
+hors cache des modules). Les modules qui ne peuvent pas être importés (PyQt5
+absent, par exemple) sont signalés sans arrêter les autres mesures.
+
+Usage : python -m bench.startup [--repeat N] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+MODULES = ("database", "models", "ui.login_window", "ui.admin_dashboard", "main")
+
+INIT_DB_SCRIPT = """
+import time
+import database
+database.DB_NAME = {path!r}
+start = time.perf_counter()
+database.init_db()
+print((time.perf_counter() - start) * 1000)
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable] + args, cwd=ROOT, capture_output=True, text=True,
+    )
+
+
+def import_times(module: str) -> Optional[Dict[str, Tuple[int, int]]]:
+    """(self, cumulé) en microsecondes par module importé, d'après -X importtime."""
+    proc = _python(["-X", "importtime", "-c", f"import {module}"])
+    if proc.returncode != 0:
+        return None
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # ligne d'en-tête
+        times[fields[2].strip()] = (own, cumulative)
+    return times
+
+
+def _best(values: List[float]) -> float:
+    return min(values) if values else float("nan")
+
+
+def run(repeat: int, top: int) -> None:
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(repeat)]
+        if any(r is None for r in runs):
+            print(f"import {module:<20} : impossible (dépendance manquante ?)")
+            continue
+        best = min(runs, key=lambda r: r[module][1])  # type: ignore[index]
+        print(f"import {module:<20} : {best[module][1] / 1000:8.1f} ms")  # type: ignore[index]
+        slowest = sorted(
+            (
+                (cumulative, name)
+                for name, (_, cumulative) in best.items()  # type: ignore[union-attr]
+                if name != module
+            ),
+            reverse=True,
+        )
+        for cumulative, name in slowest[:top]:
+            print(f"    {name:<28} {cumulative / 1000:8.1f} ms")
+
+    created, current = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(repeat):
+            path = os.path.join(tmp, f"bench{i}.db")
+            script = INIT_DB_SCRIPT.format(path=path)
+            for timings in (created, current):
+                proc = _python(["-c", script])
+                if proc.returncode == 0:
+                    timings.append(float(proc.stdout))
+    print(f"init_db (nouvelle base)      : {_best(created):8.2f} ms")
+    print(f"init_db (base à jour)        : {_best(current):8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="imports les plus lents affichés")
+    args = parser.parse_args()
+    run(args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    main()
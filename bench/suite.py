@@ -0,0 +1,167 @@
+"""Mesure des fonctions les plus appelées de models.py sur une base synthétique.
+
+Chaque fonction est appelée `--calls` fois ; la durée de chaque appel est
+relevée pour donner le débit et les percentiles. Les résultats sont écrits
+en JSON (option -o) pour être comparés d'une version à l'autre avec
+`python -m bench.compare`.
+
+Usage : python -m bench.suite [--orders N] [--servers N] [--products N]
+                              [--calls N] [--db FICHIER] [-o resultats.json]
+
+Avec --db, la base est conservée : si le fichier existe déjà, il est
+réutilisé tel quel (pas de nouvelle génération de commandes).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+import database
+import models
+from bench.seed import random_orders, seed_catalog, seed_orders
+from instrumentation import percentile
+
+
+def measure(fn: Callable[[int], object], calls: int) -> Dict[str, float]:
+    """Appelle fn(0), fn(1)… et résume les durées (en millisecondes)."""
+    durations = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    total = sum(durations)
+    return {
+        "calls": calls,
+        "ops_per_sec": calls / (total / 1000) if total else 0.0,
+        "mean_ms": total / calls,
+        "p50_ms": percentile(durations, 50),
+        "p95_ms": percentile(durations, 95),
+        "p99_ms": percentile(durations, 99),
+        "max_ms": durations[-1],
+    }
+
+
+def _prepare(args: argparse.Namespace, end: datetime) -> None:
+    existing = args.db is not None and os.path.exists(args.db)
+    database.init_db()
+    if existing:
+        return
+    seed_catalog(args.servers, args.categories, args.products, seed=args.seed)
+    seed_orders(args.orders, days=args.days, end=end, seed=args.seed)
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    end = datetime.now()
+    _prepare(args, end)
+    conn = database.get_conn()
+
+    # Identifiants de seed_catalog : la base ne contient que des empreintes.
+    # Après le premier appel par compte, la vérification est servie par le
+    # cache de utils.auth (coût de la dérivation : python -m bench.auth).
+    users = [(f"serveur{i}", f"{i:04d}") for i in range(1, args.servers + 1)]
+    users = users or [("ali", "1234")]
+    category_ids = [c["id"] for c in models.get_categories()]
+    first, last, max_id = conn.execute(
+        "SELECT MIN(date), MAX(date), MAX(id) FROM orders"
+    ).fetchone()
+    first_day = datetime.strptime(first[:10], "%Y-%m-%d") if first else end
+    last_day = datetime.strptime(last[:10], "%Y-%m-%d") if last else end
+    span = (last_day - first_day).days
+    days = [
+        (first_day + timedelta(days=rng.randint(0, span))).strftime("%Y-%m-%d")
+        for _ in range(args.calls)
+    ]
+    order_ids = [rng.randint(1, max_id or 1) for _ in range(args.calls)]
+    new_orders = random_orders(args.calls, days=1, end=end, seed=args.seed + 1)
+
+    results = {
+        "authenticate_user": measure(
+            lambda i: models.authenticate_user(*users[i % len(users)]), args.calls,
+        ),
+        "get_products_by_category": measure(
+            lambda i: models.get_products_by_category(category_ids[i % len(category_ids)]),
+            args.calls,
+        ),
+        "get_orders_between_dates": measure(
+            lambda i: models.get_orders_between_dates(days[i], days[i]), args.calls,
+        ),
+        "get_order_items": measure(
+            lambda i: models.get_order_items(order_ids[i]), args.calls,
+        ),
+        # En dernier : les commandes ajoutées ne faussent pas les lectures.
+        "create_order": measure(
+            lambda i: models.create_order(
+                new_orders[i]["serveur_id"], new_orders[i]["cart"], new_orders[i]["date"],
+            ),
+            args.calls,
+        ),
+    }
+    counts = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("users", "categories", "products", "orders", "order_items")
+    }
+    database.close_conn()
+    return {
+        "meta": {
+            "timestamp": end.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "calls": args.calls,
+            "rows": counts,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: Dict[str, Any]) -> None:
+    rows = report["meta"]["rows"]
+    print(
+        f"{rows['orders']} commandes, {rows['products']} produits, "
+        f"{rows['users']} utilisateurs ; {report['meta']['calls']} appels par mesure"
+    )
+    print(f"  {'fonction':<26} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in report["results"].items():
+        print(
+            f"  {name:<26} {r['ops_per_sec']:10.0f} {r['p50_ms']:9.3f} "
+            f"{r['p95_ms']:9.3f} {r['p99_ms']:9.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--servers", type=int, default=10, help="serveurs ajoutés")
+    parser.add_argument("--categories", type=int, default=5, help="catégories ajoutées")
+    parser.add_argument("--products", type=int, default=100, help="produits ajoutés")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="base à conserver ou à réutiliser")
+    parser.add_argument("-o", "--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = args.db or os.path.join(tmp, "bench.db")
+        report = run_suite(args)
+
+    print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Résultats écrits dans {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare l'écriture directe des commandes à l'écriture groupée (OrderWriter).
+
+Plusieurs threads producteurs (les caisses) enregistrent des commandes en
+même temps : soit chacun avec sa propre transaction (models.create_order),
+soit en les confiant au thread d'écriture unique qui les regroupe.
+
+Usage : python -m bench.writer [--orders N] [--threads 1,2,4,8] [--delay MS]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+import database
+import models
+from bench.seed import seed_catalog
+from cart import Cart
+from instrumentation import percentile
+from order_writer import OrderWriter
+
+
+def _carts(count: int, seed: int = 1) -> List[Cart]:
+    rng = random.Random(seed)
+    products = list(models.get_catalog()["products"].values())
+    carts = []
+    for _ in range(count):
+        cart = Cart()
+        for p in rng.sample(products, rng.randint(1, 4)):
+            cart.add(p["id"], p["name"], p["price"], rng.randint(1, 3))
+        carts.append(cart)
+    return carts
+
+
+def _run_producers(
+    write: Callable[[int, Cart], object],
+    carts: List[Cart],
+    threads: int,
+    serveur_id: int,
+) -> Dict[str, float]:
+    """Répartit les paniers entre `threads` producteurs et chronomètre chaque écriture."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def producer(chunk: List[Cart]) -> None:
+        local = []
+        barrier.wait()
+        try:
+            for cart in chunk:
+                start = time.perf_counter()
+                write(serveur_id, cart)
+                local.append(time.perf_counter() - start)
+        finally:
+            database.close_conn()
+        with lock:
+            latencies.extend(local)
+
+    workers = [
+        threading.Thread(target=producer, args=(carts[i::threads],))
+        for i in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "ops_per_sec": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+    }
+
+
+def run(orders: int, threads: List[int], delay: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        seed_catalog(servers=1, categories=5, products=40, seed=1)
+        serveur_id = models.get_all_servers()[0]["id"]
+        carts = _carts(orders)
+
+        print(f"{orders} commandes par mesure, fenêtre de regroupement {delay * 1000:.1f} ms")
+        print(f"{'threads':>7}  {'mode':<8} {'cmd/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for n in threads:
+            direct = _run_producers(
+                lambda sid, cart: models.create_order(sid, cart), carts, n, serveur_id,
+            )
+            writer = OrderWriter(max_delay=delay)
+            writer.start()
+            try:
+                grouped = _run_producers(writer.create_order, carts, n, serveur_id)
+            finally:
+                writer.stop()
+            for mode, r in (("direct", direct), ("groupé", grouped)):
+                print(
+                    f"{n:>7}  {mode:<8} {r['ops_per_sec']:>9.0f} "
+                    f"{r['p50']:>8.2f} {r['p99']:>8.2f}"
+                )
+        database.close_conn()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--threads", default="1,2,4,8", help="nombres de producteurs")
+    parser.add_argument("--delay", type=float, default=0.0, help="fenêtre d'attente en ms")
+    args = parser.parse_args()
+    run(args.orders, [int(n) for n in args.threads.split(",")], args.delay / 1000)
+
+
+if __name__ == "__main__":
+    main()
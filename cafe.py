@@ -0,0 +1,196 @@
+# cafe.py
+"""Outils en ligne de commande, sans interface graphique (PyQt5 n'est pas importé).
+
+Usage :
+    python -m cafe report 2024-01-01 [2024-01-31]
+    python -m cafe export 2024-01-01 2024-01-31 -o ventes.csv [--format parquet]
+    python -m cafe backup sauvegarde.db
+    python -m cafe vacuum
+    python -m cafe seed --orders 100000
+    python -m cafe serve --port 8765
+    python -m cafe bench suite --orders 50000 -o resultats.json
+
+L'option --db (avant la sous-commande) choisit un autre fichier que cafe.db ;
+--instrument FICHIER enregistre la durée des appels à models.py (voir
+instrumentation.py).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from typing import List, Optional
+
+import database
+import models
+
+BENCHMARKS = (
+    "auth", "cart", "compare", "connections", "instrument", "orders", "reports", "suite",
+    "writer",
+)
+BACKUP_PAGES = 1024
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    end = args.end or args.start
+    summary = models.get_sales_summary(args.start, end)
+    print(f"Ventes du {args.start} au {end}")
+    print(f"  {summary['orders_count']} commandes, total {summary['total']} DH")
+    if not summary["orders_count"]:
+        return 0
+    print("Par serveur :")
+    for s in models.get_sales_by_server(args.start, end):
+        print(f"  {s['serveur']:<20} {s['orders_count']:>6} cmd {s['total']:>12.2f} DH")
+    print("Par catégorie :")
+    for c in models.get_sales_by_category(args.start, end):
+        print(f"  {c['name']:<20} x{c['qty']:<6} {c['total']:>12.2f} DH")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from export import export_sales
+
+    try:
+        count = export_sales(args.output, args.start, args.end, args.format)
+    except RuntimeError as e:  # pyarrow absent pour le format parquet
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{count} lignes exportées dans {args.output}")
+    return 0
+
+
+def cmd_backup(args: argparse.Namespace) -> int:
+    """Copie cohérente de la base, même pendant que la caisse écrit (API backup)."""
+    if os.path.abspath(args.dest) == os.path.abspath(database.DB_NAME):
+        print("La sauvegarde doit être un autre fichier que la base.", file=sys.stderr)
+        return 1
+    dest = sqlite3.connect(args.dest)
+    try:
+        database.get_conn().backup(dest, pages=BACKUP_PAGES)
+    finally:
+        dest.close()
+    print(f"Base sauvegardée dans {args.dest}")
+    return 0
+
+
+def cmd_vacuum(args: argparse.Namespace) -> int:
+    conn = database.get_conn()
+    before = os.path.getsize(database.DB_NAME)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA optimize")
+    after = os.path.getsize(database.DB_NAME)
+    print(f"{database.DB_NAME} : {before / 1024:.0f} Ko -> {after / 1024:.0f} Ko")
+    return 0
+
+
+def cmd_seed(args: argparse.Namespace) -> int:
+    from bench.seed import seed_catalog, seed_orders
+
+    seed_catalog(args.servers, args.categories, args.products, seed=args.seed)
+    seed_orders(args.orders, days=args.days, seed=args.seed)
+    print(f"{args.orders} commandes générées sur {args.days} jours")
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    import importlib
+
+    module = importlib.import_module(f"bench.{args.name}")
+    sys.argv = [f"bench.{args.name}"] + args.args
+    module.main()
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from order_server import OrderServer, server_token
+
+    try:
+        token = server_token(args.host, args.token)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    server = OrderServer(args.host, args.port, token=token)
+    print(f"Serveur de commandes sur {args.host}:{args.port} (base {database.DB_NAME})")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cafe",
+        description="Rapports et maintenance de la base du café, sans interface graphique.",
+    )
+    parser.add_argument("--db", default=database.DB_NAME, help="fichier de la base")
+    parser.add_argument(
+        "--instrument",
+        metavar="FICHIER",
+        help="mesure les appels à models.py et écrit les durées dans FICHIER (JSON)",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("report", help="total et répartition des ventes d'une période")
+    p.add_argument("start", help="date de début (YYYY-MM-DD)")
+    p.add_argument("end", nargs="?", help="date de fin incluse (par défaut : début)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("export", help="export des ventes en CSV ou Parquet")
+    p.add_argument("start", help="date de début (YYYY-MM-DD)")
+    p.add_argument("end", help="date de fin incluse (YYYY-MM-DD)")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("backup", help="sauvegarde à chaud de la base")
+    p.add_argument("dest", help="fichier de destination")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("vacuum", help="compacte la base et met à jour les statistiques")
+    p.set_defaults(func=cmd_vacuum)
+
+    p = sub.add_parser("seed", help="ajoute des commandes synthétiques (tests, mesures)")
+    p.add_argument("--orders", type=int, default=10000)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--servers", type=int, default=0, help="serveurs ajoutés")
+    p.add_argument("--categories", type=int, default=0, help="catégories ajoutées")
+    p.add_argument("--products", type=int, default=0, help="produits ajoutés")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_seed)
+
+    p = sub.add_parser("serve", help="serveur de commandes pour plusieurs caisses")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--token", help="jeton partagé avec les caisses (ou CAFE_SERVER_TOKEN)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("bench", help="lance une mesure de performance (bench.<nom>)")
+    p.add_argument("name", choices=BENCHMARKS)
+    p.add_argument("args", nargs=argparse.REMAINDER, help="options de la mesure")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.instrument:
+        import instrumentation
+
+        instrumentation.install(tickets=False)
+    # Les mesures créent leur propre base temporaire.
+    if args.command != "bench":
+        database.DB_NAME = args.db
+        database.init_db()
+    try:
+        return args.func(args)
+    finally:
+        if args.instrument:
+            instrumentation.dump(args.instrument)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# cart.py
+"""Panier de la caisse, indépendant de l'interface graphique.
+
+Les montants sont tenus en centimes entiers et le total est mis à jour à
+chaque opération : il n'est jamais recalculé en parcourant les lignes.
+"""
+import struct
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from money import Money
+
+# Ligne d'une commande en attente (pack/unpack) : product_id, qty, price_cents,
+# soit 12 octets ; le nom est retrouvé dans le catalogue à la reprise.
+PACKED_LINE = struct.Struct("<IIi")
+
+
+class CartLine:
+    __slots__ = ("product_id", "name", "price_cents", "qty")
+
+    def __init__(self, product_id: int, name: str, price_cents: int, qty: int = 1) -> None:
+        self.product_id = product_id
+        self.name = name
+        self.price_cents = price_cents
+        self.qty = qty
+
+    @property
+    def total_cents(self) -> int:
+        return self.price_cents * self.qty
+
+    @property
+    def price(self) -> Money:
+        return Money(self.price_cents)
+
+    @property
+    def total(self) -> Money:
+        return Money(self.total_cents)
+
+    def __repr__(self) -> str:
+        return (
+            f"CartLine({self.product_id!r}, {self.name!r}, "
+            f"{self.price_cents!r}, {self.qty!r})"
+        )
+
+
+class Cart:
+    def __init__(self) -> None:
+        self._lines: Dict[int, CartLine] = {}
+        self._total_cents = 0
+        # Opérations annulables : ("add", id, unités restantes) ou
+        # ("drop", copie de la ligne, 1). Un ajout de qty unités tient en une
+        # entrée, que undo() retire unité par unité.
+        self._history: List[Tuple[str, object, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def __contains__(self, product_id: object) -> bool:
+        return product_id in self._lines
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(self._lines.values())
+
+    def get(self, product_id: int) -> Optional[CartLine]:
+        return self._lines.get(product_id)
+
+    @property
+    def total_cents(self) -> int:
+        return self._total_cents
+
+    @property
+    def total(self) -> Money:
+        return Money(self._total_cents)
+
+    def add(self, product_id: int, name: str, price: Money, qty: int = 1) -> CartLine:
+        return self._add(product_id, name, price.cents, qty, record=True)
+
+    def _add(
+        self,
+        product_id: int,
+        name: str,
+        price_cents: int,
+        qty: int,
+        record: bool,
+    ) -> CartLine:
+        line = self._lines.get(product_id)
+        if line is None:
+            line = CartLine(product_id, name, price_cents, qty)
+            self._lines[product_id] = line
+        else:
+            line.qty += qty
+        self._total_cents += price_cents * qty
+        if record and qty > 0:
+            self._history.append(("add", product_id, qty))
+        return line
+
+    def decrement(self, product_id: int) -> Optional[CartLine]:
+        """Retire une unité ; la ligne disparaît quand sa quantité tombe à zéro."""
+        line = self._lines.get(product_id)
+        if line is None:
+            return None
+        self._history.append(
+            ("drop", CartLine(product_id, line.name, line.price_cents, 1), 1)
+        )
+        self._decrement(line)
+        return line
+
+    def _decrement(self, line: CartLine) -> None:
+        line.qty -= 1
+        self._total_cents -= line.price_cents
+        if line.qty <= 0:
+            del self._lines[line.product_id]
+
+    def remove(self, product_id: int) -> Optional[CartLine]:
+        line = self._lines.pop(product_id, None)
+        if line is None:
+            return None
+        self._total_cents -= line.total_cents
+        self._history.append(
+            ("drop", CartLine(product_id, line.name, line.price_cents, line.qty), 1)
+        )
+        return line
+
+    def undo(self) -> Optional[int]:
+        """Annule la dernière opération et renvoie l'id du produit concerné."""
+        if not self._history:
+            return None
+        kind, data, count = self._history.pop()
+        if kind == "add":
+            if count > 1:
+                self._history.append((kind, data, count - 1))
+            line = self._lines.get(data)  # type: ignore[arg-type]
+            if line is not None:
+                self._decrement(line)
+            return data  # type: ignore[return-value]
+        dropped: CartLine = data  # type: ignore[assignment]
+        self._add(
+            dropped.product_id,
+            dropped.name,
+            dropped.price_cents,
+            dropped.qty,
+            record=False,
+        )
+        return dropped.product_id
+
+    def pack(self) -> bytes:
+        """Forme compacte des lignes (table held_orders), sans les noms ni l'historique."""
+        return b"".join(
+            PACKED_LINE.pack(line.product_id, line.qty, line.price_cents)
+            for line in self._lines.values()
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes, name_of: Callable[[int], str]) -> "Cart":
+        """Panier reconstruit depuis pack() ; `name_of(product_id)` fournit les noms."""
+        cart = cls()
+        for product_id, qty, price_cents in PACKED_LINE.iter_unpack(data):
+            cart._add(product_id, name_of(product_id), price_cents, qty, record=False)
+        return cart
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self._total_cents = 0
+        self._history.clear()
@@ -1,16 +1,109 @@
 # database.py
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+
+from migrations import LATEST_VERSION, get_version, migrate
 
 DB_NAME = "cafe.db"
 
-def get_conn():
-    return sqlite3.connect(DB_NAME)
+# Réglages appliqués une seule fois à chaque connexion ouverte.
+CACHE_SIZE_KB = 8192
+MMAP_SIZE = 64 * 1024 * 1024
+BUSY_TIMEOUT_MS = 5000
+
+_local = threading.local()
+
+
+def _configure(conn: sqlite3.Connection, readonly: bool = False) -> sqlite3.Connection:
+    c = conn.cursor()
+    if not readonly:
+        c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    c.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    c.close()
+    return conn
+
+
+def open_conn() -> sqlite3.Connection:
+    """Ouvre une connexion indépendante (à fermer par l'appelant)."""
+    return _configure(sqlite3.connect(DB_NAME))
+
+
+def open_readonly_conn() -> sqlite3.Connection:
+    """Connexion en lecture seule, utilisable depuis un autre thread (rapports)."""
+    uri = Path(DB_NAME).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+    return _configure(conn, readonly=True)
+
+
+def get_conn() -> sqlite3.Connection:
+    """Connexion partagée du thread courant, ouverte et configurée une seule fois.
+
+    La connexion est en mode autocommit : les écritures passent par
+    `transaction()`. Elle ne doit pas être fermée par l'appelant.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_NAME:
+        return conn
+    if conn is not None:
+        conn.close()
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    _configure(conn)
+    _local.conn = conn
+    _local.path = DB_NAME
+    return conn
+
+
+def close_conn() -> None:
+    """Ferme la connexion partagée du thread courant (fin de thread, tests)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.path = None
+
+
+@contextmanager
+def using_conn(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Fait utiliser `conn` par les fonctions de models.py dans le thread courant."""
+    previous = (getattr(_local, "conn", None), getattr(_local, "path", None))
+    _local.conn = conn
+    _local.path = DB_NAME
+    try:
+        yield conn
+    finally:
+        _local.conn, _local.path = previous
+
+
+@contextmanager
+def transaction(immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """Exécute un bloc d'écritures dans une transaction explicite."""
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        # SQLite a pu annuler la transaction de lui-même (SQLITE_FULL, IOERR…) :
+        # un ROLLBACK masquerait alors l'erreur d'origine.
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
 
 def init_db():
     """Création automatique de la base de données + données de départ."""
     new_db = not Path(DB_NAME).exists()
-    conn = get_conn()
+    # Cas courant : base déjà à jour, aucune table à créer ni migration à faire.
+    if not new_db and get_version(get_conn()) >= LATEST_VERSION:
+        return
+    conn = open_conn()
     c = conn.cursor()
 
     # Utilisateurs (serveurs)
@@ -133,4 +226,7 @@ def init_db():
         )
 
     conn.commit()
+
+    # Index et évolutions du schéma, y compris sur les bases déjà en service
+    migrate(conn)
     conn.close()
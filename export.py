@@ -0,0 +1,107 @@
+# export.py
+"""Export des ventes (une ligne par article vendu) pour la comptabilité.
+
+Les lignes sont lues par lots (fetchmany) et écrites au fur et à mesure :
+la mémoire utilisée ne dépend pas de la taille de la période.
+
+En ligne de commande : python -m cafe export 2024-01-01 2024-01-31 -o ventes.csv
+[--format parquet]
+"""
+import csv
+from typing import Iterator, List, Tuple
+
+from database import get_conn
+from models import day_range
+from money import Money
+
+
+def iter_order_lines(
+    start_date: str,
+    end_date: str,
+    batch_size: int = 5000,
+) -> Iterator[List[Tuple]]:
+    """Lignes vendues de la période, par lots de `batch_size`, dans l'ordre des commandes."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT o.id, o.date, IFNULL(u.username, ''), oi.product_id, IFNULL(p.name, ''),
+               oi.qty, oi.price_cents, oi.qty * oi.price_cents, o.total_cents
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        LEFT JOIN users u ON u.id = o.serveur_id
+        LEFT JOIN products p ON p.id = oi.product_id
+        WHERE o.date >= ? AND o.date < ?
+        ORDER BY o.date, o.id, oi.id
+        """,
+        day_range(start_date, end_date),
+    )
+    while True:
+        rows = c.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def export_csv(path: str, start_date: str, end_date: str, batch_size: int = 5000) -> int:
+    """Écrit la période en CSV (montants en dirhams, ex. "12.50") ; renvoie le nombre de lignes."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ("order_id", "date", "serveur", "product_id", "product",
+             "qty", "price", "line_total", "order_total")
+        )
+        for rows in iter_order_lines(start_date, end_date, batch_size):
+            writer.writerows(
+                (oid, date, serveur, pid, name, qty,
+                 Money(price), Money(line_total), Money(order_total))
+                for oid, date, serveur, pid, name, qty, price, line_total, order_total in rows
+            )
+            count += len(rows)
+    return count
+
+
+def export_parquet(path: str, start_date: str, end_date: str, batch_size: int = 50000) -> int:
+    """Écrit la période en Parquet (colonnes, montants en centimes).
+
+    Nécessite le paquet optionnel pyarrow (pip install pyarrow).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError(
+            "L'export Parquet nécessite pyarrow : pip install pyarrow"
+        ) from None
+
+    schema = pa.schema([
+        ("order_id", pa.int64()),
+        ("date", pa.string()),
+        ("serveur", pa.string()),
+        ("product_id", pa.int64()),
+        ("product", pa.string()),
+        ("qty", pa.int64()),
+        ("price_cents", pa.int64()),
+        ("line_total_cents", pa.int64()),
+        ("order_total_cents", pa.int64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_order_lines(start_date, end_date, batch_size):
+            columns = list(zip(*rows))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                    schema=schema,
+                )
+            )
+            count += len(rows)
+    return count
+
+
+def export_sales(path: str, start_date: str, end_date: str, fmt: str = "csv") -> int:
+    if fmt == "parquet":
+        return export_parquet(path, start_date, end_date)
+    return export_csv(path, start_date, end_date)
+
@@ -0,0 +1,259 @@
+# instrumentation.py
+"""Mesure, à la demande, du temps passé dans la couche de données.
+
+Désactivée par défaut. Avec la variable d'environnement CAFE_INSTRUMENT=1
+(ou un appel à install()), chaque fonction publique de models.py et les
+fonctions d'impression des tickets sont enveloppées : durée de l'appel,
+nombre de requêtes SQL exécutées et nombre d'éléments renvoyés.
+
+Les durées des derniers appels (MAX_SAMPLES par fonction) sont gardées en
+mémoire pour calculer les percentiles. Les appels imbriqués sont comptés
+dans la fonction appelante comme dans la fonction appelée.
+"""
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+import database
+
+ENV_VAR = "CAFE_INSTRUMENT"
+MAX_SAMPLES = 10000
+
+# Fonctions des tickets mesurées en plus de celles de models.py.
+TICKET_FUNCTIONS = (
+    "generate_and_print_ticket",
+    "render_ticket",
+    "build_ticket_text",
+    "write_ticket",
+    "print_ticket",
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_stats: Dict[str, "_Stat"] = {}
+_installed = False
+
+
+class _Stat:
+    __slots__ = ("calls", "total_ms", "max_ms", "queries", "rows", "samples")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.samples: Deque[float] = deque(maxlen=MAX_SAMPLES)
+
+
+def enabled_from_env() -> bool:
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+def is_installed() -> bool:
+    return _installed
+
+
+def _count_query(statement: str) -> None:
+    # Les instructions des triggers (totaux journaliers) sont signalées avec
+    # le texte de l'instruction qui les déclenche : on ne les compte pas.
+    # last_statement est remis à zéro à chaque appel mesuré (_begin_call),
+    # pour que la même requête répétée d'un appel à l'autre soit comptée.
+    if statement == getattr(_local, "last_statement", None):
+        return
+    _local.last_statement = statement
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def _queries() -> int:
+    return getattr(_local, "queries", 0)
+
+
+def _begin_call() -> int:
+    _local.last_statement = None
+    return _queries()
+
+
+def _row_count(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def _record(name: str, elapsed_ms: float, queries: int, rows: int) -> None:
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = _Stat()
+        stat.calls += 1
+        stat.total_ms += elapsed_ms
+        stat.max_ms = max(stat.max_ms, elapsed_ms)
+        stat.queries += queries
+        stat.rows += rows
+        stat.samples.append(elapsed_ms)
+
+
+def _wrap(name: str, fn: Callable) -> Callable:
+    if inspect.isgeneratorfunction(fn):
+        # Seul le temps passé dans le générateur compte, pas celui de l'appelant
+        # entre deux morceaux.
+        @functools.wraps(fn)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            it = fn(*args, **kwargs)
+            elapsed = 0.0
+            queries = rows = 0
+            try:
+                while True:
+                    q0 = _begin_call()
+                    start = time.perf_counter()
+                    try:
+                        chunk = next(it)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                        queries += _queries() - q0
+                    rows += _row_count(chunk)
+                    yield chunk
+            finally:
+                _record(name, elapsed * 1000, queries, rows)
+
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        q0 = _begin_call()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            _record(
+                name,
+                (time.perf_counter() - start) * 1000,
+                _queries() - q0,
+                _row_count(result),
+            )
+
+    return wrapper
+
+
+def _rebind(original: Callable, wrapped: Callable) -> None:
+    """Remplace aussi les noms importés avec `from models import …`."""
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not namespace:
+            continue
+        for attr, value in list(namespace.items()):
+            if value is original:
+                setattr(module, attr, wrapped)
+
+
+def _instrument(module: Any, names: List[str]) -> None:
+    for attr in names:
+        fn = getattr(module, attr, None)
+        if fn is None or hasattr(fn, "__wrapped__"):
+            continue
+        _rebind(fn, _wrap(f"{module.__name__}.{attr}", fn))
+
+
+def _configure_traced(configure: Callable) -> Callable:
+    @functools.wraps(configure)
+    def wrapper(conn: sqlite3.Connection, *args: Any, **kwargs: Any) -> sqlite3.Connection:
+        conn = configure(conn, *args, **kwargs)
+        conn.set_trace_callback(_count_query)
+        return conn
+
+    return wrapper
+
+
+def install(tickets: bool = True) -> None:
+    """Active les mesures ; à appeler une fois, au démarrage.
+
+    Les noms déjà importés ailleurs (`from models import create_order`) sont
+    remplacés eux aussi, l'ordre des imports n'a donc pas d'importance.
+    tickets=False évite d'importer utils.tickets (et donc PyQt5).
+    """
+    global _installed
+    if _installed:
+        return
+    import models
+
+    # Compte les requêtes sur toutes les connexions ouvertes à partir d'ici,
+    # et sur la connexion déjà ouverte par le thread courant.
+    database._configure = _configure_traced(database._configure)
+    current = getattr(database._local, "conn", None)
+    if current is not None:
+        current.set_trace_callback(_count_query)
+
+    _instrument(
+        models,
+        [
+            name
+            for name, fn in vars(models).items()
+            if inspect.isfunction(fn)
+            and fn.__module__ == models.__name__
+            and not name.startswith("_")
+        ],
+    )
+    if tickets:
+        import utils.tickets
+
+        _instrument(utils.tickets, list(TICKET_FUNCTIONS))
+    _installed = True
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Valeur au rang `pct` % d'une liste déjà triée (aussi utilisée par bench/)."""
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def snapshot() -> List[Dict[str, Any]]:
+    """Statistiques par fonction, de la plus coûteuse (temps total) à la moins coûteuse."""
+    with _lock:
+        items = [
+            (name, s.calls, s.total_ms, s.max_ms, s.queries, s.rows, sorted(s.samples))
+            for name, s in _stats.items()
+        ]
+    result = []
+    for name, calls, total_ms, max_ms, queries, rows, samples in items:
+        result.append({
+            "name": name,
+            "calls": calls,
+            "total_ms": total_ms,
+            "mean_ms": total_ms / calls,
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "max_ms": max_ms,
+            "queries": queries,
+            "rows": rows,
+        })
+    result.sort(key=lambda s: s["total_ms"], reverse=True)
+    return result
+
+
+def dump(path: str) -> None:
+    """Écrit les statistiques actuelles en JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "functions": snapshot()},
+            f,
+            indent=2,
+        )
@@ -0,0 +1,364 @@
+# journal.py
+"""Journal des commandes de la caisse : l'encaissement ne dépend plus de SQLite.
+
+Une commande payée est d'abord ajoutée à la fin d'un fichier (une ligne JSON
+par commande, écrite et transmise au système avant de rendre la main) ; un
+thread de fond l'enregistre ensuite dans cafe.db, par lots, en réessayant
+tant que la base est verrouillée ou indisponible. Le même thread fait un
+fsync du journal à chaque lot : un arrêt brutal du programme ne perd rien,
+une coupure de courant au plus les dernières millisecondes.
+
+Le numéro de commande est attribué par le journal au moment du paiement,
+pour que le ticket puisse être imprimé tout de suite. Les numéros sont pris
+dans des plages réservées à l'avance dans sqlite_sequence (reserve_ids) : les
+autres programmes qui écrivent dans la même base (serveur de commandes
+hébergé sur cette caisse, outils) reçoivent des numéros au-delà, et le
+numéro imprimé est bien celui de la commande enregistrée. Chaque commande
+porte aussi un uid : au démarrage, la caisse rejoue son journal (replay) et
+ignore les commandes déjà présentes dans la base.
+
+Un journal n'appartient qu'à un processus à la fois (verrou sur le fichier
+<journal>.lock) : seul son propriétaire le rejoue et le vide, jamais un outil
+en ligne de commande lancé pendant que la caisse tourne.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import models
+from cart import Cart
+from database import close_conn, get_conn, transaction
+from money import Money
+
+ROTATE_BYTES = 1024 * 1024
+BATCH_SIZE = 500
+RESERVE_IDS = 20
+STOP_TIMEOUT = 10.0
+
+
+def journal_path(db_name: str) -> str:
+    """cafe.db -> cafe_orders.journal (à côté de la base)."""
+    return os.path.splitext(db_name)[0] + "_orders.journal"
+
+
+class JournalBusy(RuntimeError):
+    """Le journal est déjà ouvert par un autre processus."""
+
+
+def _lock_file(path: str) -> Any:
+    """Ouvre et verrouille `path` (sans attendre) ; lève JournalBusy s'il est pris."""
+    f = open(path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        raise JournalBusy(f"Journal déjà utilisé par un autre programme : {path}") from None
+    return f
+
+
+def _cart(record: Dict[str, Any]) -> Cart:
+    cart = Cart()
+    for product_id, name, price_cents, qty in record["lines"]:
+        cart.add(product_id, name, Money(price_cents), qty)
+    return cart
+
+
+def _existing(column: str, values: List[Any]) -> Dict[Any, Any]:
+    """{valeur: uid} des commandes dont `column` (id ou uid) est dans `values`."""
+    found: Dict[Any, Any] = {}
+    conn = get_conn()
+    for offset in range(0, len(values), 500):
+        chunk = values[offset:offset + 500]
+        marks = ",".join("?" * len(chunk))
+        for value, uid in conn.execute(
+            f"SELECT {column}, uid FROM orders WHERE {column} IN ({marks})", chunk,
+        ):
+            found[value] = uid
+    return found
+
+
+def apply_records(records: List[Dict[str, Any]]) -> int:
+    """Enregistre les commandes du journal absentes de la base, en une transaction.
+
+    Renvoie le nombre de commandes ajoutées. Si un numéro a été pris entre-temps
+    par une autre commande (autre programme sur la même base), la commande est
+    enregistrée sous un nouveau numéro plutôt que perdue.
+    """
+    applied = _existing("uid", [r["uid"] for r in records])
+    todo = [r for r in records if r["uid"] not in applied]
+    if not todo:
+        return 0
+    taken = _existing("id", [r["id"] for r in todo])
+    models.create_orders([
+        {
+            "id": None if r["id"] in taken else r["id"],
+            "uid": r["uid"],
+            "serveur_id": r["serveur_id"],
+            "cart": _cart(r),
+            "date": r["date"],
+        }
+        for r in todo
+    ])
+    return len(todo)
+
+
+def reserve_ids(count: int, floor: int = 0) -> Tuple[int, int]:
+    """Réserve `count` numéros de commande et renvoie la plage (premier, dernier).
+
+    sqlite_sequence est avancé d'autant : les insertions AUTOINCREMENT des
+    autres connexions partent au-delà de la plage.
+    """
+    with transaction(immediate=True) as conn:
+        seq = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name='orders'"
+        ).fetchone()
+        max_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM orders").fetchone()[0]
+        first = max(seq[0] if seq else 0, max_id, floor) + 1
+        last = first + count - 1
+        if seq:
+            conn.execute("UPDATE sqlite_sequence SET seq=? WHERE name='orders'", (last,))
+        else:
+            conn.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('orders', ?)", (last,)
+            )
+    return first, last
+
+
+def release_ids(first_unused: int, last: int) -> None:
+    """Rend les numéros [first_unused, last] si personne n'a réservé après eux."""
+    with transaction(immediate=True) as conn:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq=? WHERE name='orders' AND seq=?",
+            (first_unused - 1, last),
+        )
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Commandes du journal ; une dernière ligne incomplète (arrêt brutal) est ignorée."""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def checkpoint() -> None:
+    """Rend les commandes déjà enregistrées durables dans cafe.db (avant de vider le journal)."""
+    get_conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def replay(path: str) -> int:
+    """Enregistre les commandes restées dans le journal, puis le vide (démarrage)."""
+    records = list(read_records(path))
+    count = 0
+    for offset in range(0, len(records), BATCH_SIZE):
+        count += apply_records(records[offset:offset + BATCH_SIZE])
+    if os.path.exists(path):
+        checkpoint()
+        with open(path, "w", encoding="utf-8") as f:
+            os.fsync(f.fileno())
+    return count
+
+
+class OrderJournal:
+    def __init__(
+        self,
+        path: str,
+        retry_delay: float = 0.5,
+        rotate_bytes: int = ROTATE_BYTES,
+    ) -> None:
+        self.path = path
+        self.retry_delay = retry_delay
+        self.rotate_bytes = rotate_bytes
+        self._lock = threading.Lock()
+        self._records: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._file: Any = None
+        self._lock_handle: Any = None
+        # Plage de numéros en cours, et la suivante réservée d'avance par le
+        # thread de fond pour que le paiement n'attende pas la base.
+        self._next_id = 0
+        self._last_id = -1
+        self._spare: Optional[Tuple[int, int]] = None
+        self._appended = 0
+        self._applied = 0
+        # Fixé par stop() : au-delà, le thread de fond cesse de réessayer.
+        self._deadline: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Prend le journal, rejoue les commandes de la session précédente et l'ouvre.
+
+        Lève JournalBusy si un autre processus l'utilise déjà.
+        """
+        if self._thread is not None:
+            return
+        self._lock_handle = _lock_file(self.path + ".lock")
+        try:
+            replay(self.path)
+            self._next_id, self._last_id = reserve_ids(RESERVE_IDS)
+            self._file = open(self.path, "a", encoding="utf-8")
+        except BaseException:
+            self._lock_handle.close()
+            raise
+        self._thread = threading.Thread(
+            target=self._run, name="order-journal", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """Enregistre les commandes en attente, rend les numéros inutilisés et ferme le journal.
+
+        Si la base reste indisponible plus de `timeout` secondes, les commandes
+        non enregistrées restent dans le journal pour le prochain démarrage.
+        """
+        if self._thread is None:
+            return
+        self._deadline = time.monotonic() + timeout
+        self._records.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        if not self.pending():
+            last = self._spare[1] if self._spare else self._last_id
+            try:
+                release_ids(self._next_id, last)
+            except sqlite3.Error:
+                pass  # numéros perdus, sans conséquence
+        self._lock_handle.close()
+
+    def pending(self) -> int:
+        return self._appended - self._applied
+
+    def append(
+        self,
+        serveur_id: int,
+        cart: Cart,
+        date_str: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Journalise une commande et la renvoie sous la forme de models.create_order."""
+        date_str = date_str or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lines = [
+            [line.product_id, line.name, line.price_cents, line.qty] for line in cart
+        ]
+        with self._lock:
+            if self._next_id > self._last_id:
+                self._take_spare()
+            record = {
+                "id": self._next_id,
+                "uid": uuid.uuid4().hex,
+                "serveur_id": serveur_id,
+                "date": date_str,
+                "lines": lines,
+            }
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            self._next_id += 1
+            self._appended += 1
+        self._records.put(record)
+        return models.order_data(record["id"], serveur_id, cart, date_str)
+
+    def _take_spare(self) -> None:
+        """Passe à la plage suivante (réservée ici si le thread de fond ne l'a pas fait)."""
+        if self._spare is None:
+            # Peut lever sqlite3.Error si la base reste verrouillée.
+            self._spare = reserve_ids(RESERVE_IDS)
+        self._next_id, self._last_id = self._spare
+        self._spare = None
+
+    def _reserve_ahead(self) -> None:
+        with self._lock:
+            if self._spare is not None or self._last_id - self._next_id >= RESERVE_IDS // 2:
+                return
+        try:
+            spare = reserve_ids(RESERVE_IDS)
+        except sqlite3.Error:
+            return
+        with self._lock:
+            if self._spare is None:
+                self._spare = spare
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Attend au moins une commande, puis prend celles déjà arrivées.
+
+        Renvoie None à l'arrêt, une fois toutes les commandes prises.
+        """
+        first = self._records.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < BATCH_SIZE:
+            try:
+                record = self._records.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                # Arrêt demandé : ce lot d'abord, puis fin de la boucle.
+                self._records.put(None)
+                break
+            batch.append(record)
+        return batch
+
+    def _sync(self) -> None:
+        with self._lock:
+            os.fsync(self._file.fileno())
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                self._sync()
+                while True:
+                    try:
+                        apply_records(batch)
+                        break
+                    except sqlite3.Error:
+                        # Base verrouillée ou disque indisponible : la commande
+                        # reste dans le journal, on réessaie (jusqu'à l'arrêt).
+                        if self._deadline is not None and time.monotonic() >= self._deadline:
+                            return
+                        time.sleep(self.retry_delay)
+                        self._sync()
+                with self._lock:
+                    self._applied += len(batch)
+                self._maybe_rotate()
+                self._reserve_ahead()
+        finally:
+            close_conn()
+
+    def _maybe_rotate(self) -> None:
+        """Vide le journal quand tout y est enregistré et qu'il dépasse rotate_bytes."""
+        with self._lock:
+            if self._appended != self._applied or self._file.tell() < self.rotate_bytes:
+                return
+        # Hors du verrou : les paiements n'attendent pas le checkpoint.
+        try:
+            checkpoint()
+        except sqlite3.Error:
+            return
+        with self._lock:
+            if self._appended != self._applied:
+                return  # commande arrivée entre-temps : au prochain lot
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
@@ -1,7 +1,6 @@
 # app.py
 import sys
 import os
-from datetime import datetime
 
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import (
@@ -12,7 +11,11 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QSize
 from PyQt5.QtGui import QIcon
 
-from database import init_db, get_conn, DB_NAME
+from cart import Cart
+from database import init_db, open_conn, DB_NAME
+from models import authenticate_user, create_order
+from money import Money
+from utils.auth import TooManyAttempts
 
 
 # ==========================
@@ -49,17 +52,14 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Erreur", "Veuillez remplir tous les champs.")
             return
 
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute(
-            "SELECT id, role FROM users WHERE username=? AND password=?",
-            (username, password)
-        )
-        row = c.fetchone()
-        conn.close()
+        try:
+            user = authenticate_user(username, password)
+        except TooManyAttempts as e:
+            QMessageBox.warning(self, "Erreur", str(e))
+            return
 
-        if row:
-            user_id, role = row
+        if user:
+            user_id = user["id"]
             # ouvrir la fenêtre principale POS
             self.pos_window = POSWindow(user_id, username)
             self.pos_window.show()
@@ -82,7 +82,7 @@ class POSWindow(QWidget):
 
         # Cart structure: {product_id: {"name":..., "price":..., "qty":...}}
         self.cart = {}
-        self.total = 0.0
+        self.total = Money(0)
 
         main_layout = QHBoxLayout()
 
@@ -91,7 +91,7 @@ class POSWindow(QWidget):
         cat_layout = QVBoxLayout()
 
         self.category_buttons = []
-        conn = get_conn()
+        conn = open_conn()
         c = conn.cursor()
         c.execute("SELECT id, name FROM categories")
         self.categories = c.fetchall()  # [(id, name), ...]
@@ -152,13 +152,13 @@ class POSWindow(QWidget):
             if w:
                 w.setParent(None)
 
-        conn = get_conn()
+        conn = open_conn()
         c = conn.cursor()
         c.execute(
-            "SELECT id, name, price FROM products WHERE category_id=?",
+            "SELECT id, name, price_cents FROM products WHERE category_id=?",
             (category_id,)
         )
-        products = c.fetchall()
+        products = [(pid, name, Money(cents)) for pid, name, cents in c.fetchall()]
         conn.close()
 
         if not products:
@@ -194,7 +194,7 @@ class POSWindow(QWidget):
 
     def refresh_cart(self):
         self.cart_list.clear()
-        self.total = 0.0
+        self.total = Money(0)
 
         for prod_id, data in self.cart.items():
             name = data["name"]
@@ -230,25 +230,11 @@ class POSWindow(QWidget):
             QMessageBox.warning(self, "Erreur", "La commande est vide.")
             return
 
-        conn = get_conn()
-        c = conn.cursor()
-
-        # Insérer la commande
-        c.execute(
-            "INSERT INTO orders (serveur_id, total, date) VALUES (?, ?, ?)",
-            (self.serveur_id, self.total, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        )
-        order_id = c.lastrowid
-
-        # Insérer les lignes de commande
+        # Commande et lignes (montants en centimes) via models.py
+        cart = Cart()
         for prod_id, data in self.cart.items():
-            c.execute(
-                "INSERT INTO order_items (order_id, product_id, qty, price) VALUES (?, ?, ?, ?)",
-                (order_id, prod_id, data["qty"], data["price"])
-            )
-
-        conn.commit()
-        conn.close()
+            cart.add(prod_id, data["name"], data["price"], data["qty"])
+        order_id = create_order(self.serveur_id, cart)["id"]
 
         # Générer et imprimer ticket
         self.generate_and_print_ticket(order_id)
@@ -261,11 +247,11 @@ class POSWindow(QWidget):
     def generate_and_print_ticket(self, order_id):
         """Génère un ticket en français et tente de l'envoyer à l'imprimante."""
         # Charger données commande
-        conn = get_conn()
+        conn = open_conn()
         c = conn.cursor()
 
         c.execute("""
-            SELECT o.id, o.total, o.date, u.username
+            SELECT o.id, o.total_cents, o.date, u.username
             FROM orders o
             JOIN users u ON o.serveur_id = u.id
             WHERE o.id=?
@@ -273,7 +259,7 @@ class POSWindow(QWidget):
         order = c.fetchone()
 
         c.execute("""
-            SELECT p.name, oi.qty, oi.price
+            SELECT p.name, oi.qty, oi.price_cents
             FROM order_items oi
             JOIN products p ON oi.product_id = p.id
             WHERE oi.order_id=?
@@ -285,7 +271,8 @@ class POSWindow(QWidget):
         if not order:
             return
 
-        order_id, total, date_str, serveur_name = order
+        order_id, total_cents, date_str, serveur_name = order
+        total = Money(total_cents)
 
         lines = []
         lines.append("        Café Ouchrif")
@@ -296,8 +283,8 @@ class POSWindow(QWidget):
         lines.append(f"N° Cmd  : {order_id}")
         lines.append("--------------------------------")
 
-        for name, qty, price in items:
-            line_total = qty * price
+        for name, qty, price_cents in items:
+            line_total = Money(price_cents) * qty
             lines.append(f"{name} x{qty}  {line_total:.2f} DH")
 
         lines.append("--------------------------------")
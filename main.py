@@ -2,16 +2,23 @@ import sys
 
 from PyQt5.QtWidgets import QApplication
 
+import instrumentation
 from database import init_db
+from store import close_store
 from ui.login_window import LoginWindow
 
 
 def main() -> None:
+    if instrumentation.enabled_from_env():
+        instrumentation.install()
     init_db()
     app = QApplication(sys.argv)
     window = LoginWindow()
     window.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    # Commandes encore dans le journal : enregistrées avant de quitter.
+    close_store()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -10,7 +10,22 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Modules jamais utilisés par la caisse : exe plus petit, extraction plus rapide.
+    excludes=[
+        'tkinter',
+        'unittest',
+        'pydoc',
+        'pyarrow',
+        'bench',
+        'cafe',
+        'PyQt5.QtNetwork',
+        'PyQt5.QtQml',
+        'PyQt5.QtQuick',
+        'PyQt5.QtSql',
+        'PyQt5.QtSvg',
+        'PyQt5.QtWebEngineWidgets',
+        'PyQt5.QtMultimedia',
+    ],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +41,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX réduit la taille mais chaque lancement doit décompresser les DLL Qt.
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -0,0 +1,332 @@
+# migrations.py
+"""Évolution versionnée du schéma (suivie par PRAGMA user_version).
+
+Chaque étape porte un numéro de version strictement croissant et s'exécute
+dans sa propre transaction, avec la mise à jour de user_version : une base
+interrompue en cours de migration reste donc à la dernière version complète.
+Pour faire évoluer le schéma, ajouter une fonction à la fin de MIGRATIONS
+sans jamais modifier les étapes déjà publiées.
+"""
+import sqlite3
+from typing import Any, Callable, Dict, List, Tuple
+
+from utils.auth import hash_password, is_hashed
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_indexes(conn: sqlite3.Connection) -> None:
+    # Anciennes bases (app.py) : la colonne category_id n'existait pas encore.
+    if "category_id" not in _columns(conn, "products"):
+        conn.execute("ALTER TABLE products ADD COLUMN category_id INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_orders_serveur ON orders(serveur_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id)"
+    )
+
+
+def _rebuild_table(
+    conn: sqlite3.Connection,
+    table: str,
+    create_sql: str,
+    columns: str,
+    select_sql: str,
+) -> None:
+    """Recrée `table` avec un nouveau schéma en conservant ses lignes et son compteur."""
+    seq = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name=?", (table,)
+    ).fetchone()
+    conn.execute(create_sql.format(table=f"{table}_new"))
+    conn.execute(f"INSERT INTO {table}_new ({columns}) {select_sql}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if seq:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name=?",
+            (seq[0], table),
+        )
+
+
+def _money_to_cents(conn: sqlite3.Connection) -> None:
+    # Montants REAL (dirhams) → INTEGER (centimes) : sommes exactes dans SQLite.
+    _rebuild_table(
+        conn,
+        "products",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price_cents INTEGER NOT NULL,
+            category_id INTEGER,
+            FOREIGN KEY(category_id) REFERENCES categories(id)
+        )
+        """,
+        "id, name, price_cents, category_id",
+        "SELECT id, name, CAST(ROUND(price * 100) AS INTEGER), category_id FROM products",
+    )
+    _rebuild_table(
+        conn,
+        "orders",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            serveur_id INTEGER,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            date TEXT,
+            FOREIGN KEY(serveur_id) REFERENCES users(id)
+        )
+        """,
+        "id, serveur_id, total_cents, date",
+        "SELECT id, serveur_id, CAST(ROUND(IFNULL(total, 0) * 100) AS INTEGER), date FROM orders",
+    )
+    _rebuild_table(
+        conn,
+        "order_items",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER,
+            product_id INTEGER,
+            qty INTEGER,
+            price_cents INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(order_id) REFERENCES orders(id),
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        )
+        """,
+        "id, order_id, product_id, qty, price_cents",
+        "SELECT id, order_id, product_id, qty, "
+        "CAST(ROUND(IFNULL(price, 0) * 100) AS INTEGER) FROM order_items",
+    )
+    # DROP TABLE a supprimé les index de l'étape 1.
+    _add_indexes(conn)
+
+
+def _sales_summaries(conn: sqlite3.Connection) -> None:
+    # Totaux pré-agrégés pour les rapports, tenus à jour par des triggers à
+    # chaque insertion de commande : un rapport lit quelques lignes par jour
+    # au lieu de toutes les commandes de la période.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day TEXT NOT NULL,
+        serveur_id INTEGER NOT NULL,
+        orders_count INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, serveur_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_hourly (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        orders_count INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_product_daily (
+        day TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, product_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_category_daily (
+        day TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, category_id)
+    ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_orders_sales AFTER INSERT ON orders
+    BEGIN
+        INSERT INTO sales_daily (day, serveur_id, orders_count, total_cents)
+        VALUES (substr(NEW.date, 1, 10), IFNULL(NEW.serveur_id, 0), 1, NEW.total_cents)
+        ON CONFLICT (day, serveur_id) DO UPDATE SET
+            orders_count = orders_count + 1,
+            total_cents = total_cents + excluded.total_cents;
+        INSERT INTO sales_hourly (day, hour, orders_count, total_cents)
+        VALUES (
+            substr(NEW.date, 1, 10),
+            CAST(substr(NEW.date, 12, 2) AS INTEGER),
+            1,
+            NEW.total_cents
+        )
+        ON CONFLICT (day, hour) DO UPDATE SET
+            orders_count = orders_count + 1,
+            total_cents = total_cents + excluded.total_cents;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_order_items_sales AFTER INSERT ON order_items
+    BEGIN
+        INSERT INTO sales_product_daily (day, product_id, qty, total_cents)
+        SELECT substr(o.date, 1, 10), NEW.product_id, NEW.qty, NEW.qty * NEW.price_cents
+        FROM orders o WHERE o.id = NEW.order_id
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            qty = qty + excluded.qty,
+            total_cents = total_cents + excluded.total_cents;
+        INSERT INTO sales_category_daily (day, category_id, qty, total_cents)
+        SELECT
+            substr(o.date, 1, 10),
+            IFNULL((SELECT category_id FROM products WHERE id = NEW.product_id), 0),
+            NEW.qty,
+            NEW.qty * NEW.price_cents
+        FROM orders o WHERE o.id = NEW.order_id
+        ON CONFLICT (day, category_id) DO UPDATE SET
+            qty = qty + excluded.qty,
+            total_cents = total_cents + excluded.total_cents;
+    END
+    """)
+
+    # Reprise de l'historique existant
+    conn.execute("""
+    INSERT INTO sales_daily (day, serveur_id, orders_count, total_cents)
+    SELECT substr(date, 1, 10), IFNULL(serveur_id, 0), COUNT(*), SUM(total_cents)
+    FROM orders WHERE date IS NOT NULL GROUP BY 1, 2
+    """)
+    conn.execute("""
+    INSERT INTO sales_hourly (day, hour, orders_count, total_cents)
+    SELECT substr(date, 1, 10), CAST(substr(date, 12, 2) AS INTEGER),
+           COUNT(*), SUM(total_cents)
+    FROM orders WHERE date IS NOT NULL GROUP BY 1, 2
+    """)
+    conn.execute("""
+    INSERT INTO sales_product_daily (day, product_id, qty, total_cents)
+    SELECT substr(o.date, 1, 10), oi.product_id, SUM(oi.qty), SUM(oi.qty * oi.price_cents)
+    FROM order_items oi JOIN orders o ON o.id = oi.order_id
+    WHERE o.date IS NOT NULL
+    GROUP BY 1, 2
+    """)
+    conn.execute("""
+    INSERT INTO sales_category_daily (day, category_id, qty, total_cents)
+    SELECT substr(o.date, 1, 10), IFNULL(p.category_id, 0),
+           SUM(oi.qty), SUM(oi.qty * oi.price_cents)
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+    LEFT JOIN products p ON p.id = oi.product_id
+    WHERE o.date IS NOT NULL
+    GROUP BY 1, 2
+    """)
+
+
+def _order_uids(conn: sqlite3.Connection) -> None:
+    # Identifiant unique attribué par le journal des commandes (journal.py) :
+    # une commande rejouée après un arrêt brutal n'est jamais enregistrée deux fois.
+    conn.execute("ALTER TABLE orders ADD COLUMN uid TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_uid ON orders(uid)")
+
+
+def _hash_plain_passwords(conn: sqlite3.Connection) -> Dict[Tuple[int, str], str]:
+    """Empreintes des mots de passe en clair, calculées avant la transaction."""
+    return {
+        (user_id, password): hash_password(password)
+        for user_id, password in conn.execute("SELECT id, password FROM users")
+        if not is_hashed(password)
+    }
+
+
+def _hash_passwords(conn: sqlite3.Connection, hashes: Dict[Tuple[int, str], str]) -> None:
+    # Noms d'utilisateur uniques : les doublons (hors le plus ancien) sont renommés
+    # « nom_<id> » pour pouvoir poser l'index ; leur mot de passe est conservé.
+    conn.execute("""
+    UPDATE users SET username = username || '_' || id
+    WHERE id NOT IN (SELECT MIN(id) FROM users GROUP BY username)
+    """)
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username)"
+    )
+    # Mots de passe en clair → empreintes salées (utils.auth), déjà calculées
+    # par _hash_plain_passwords sauf pour un compte modifié entre-temps.
+    rows = conn.execute("SELECT id, password FROM users").fetchall()
+    conn.executemany(
+        "UPDATE users SET password=? WHERE id=?",
+        [
+            (hashes.get((user_id, password)) or hash_password(password), user_id)
+            for user_id, password in rows
+            if not is_hashed(password)
+        ],
+    )
+
+
+def _user_pins(conn: sqlite3.Connection) -> None:
+    # Code PIN haché (utils.auth.hash_pin) pour changer de serveur à la caisse
+    # sans repasser par l'écran de connexion ; NULL = pas de changement rapide.
+    conn.execute("ALTER TABLE users ADD COLUMN pin TEXT")
+
+
+def _held_orders(conn: sqlite3.Connection) -> None:
+    # Commandes en attente (tables ouvertes) de la caisse : lignes au format
+    # compact de Cart.pack(), une ligne par table.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS held_orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        serveur_id INTEGER NOT NULL,
+        label TEXT NOT NULL,
+        lines BLOB NOT NULL,
+        updated TEXT NOT NULL,
+        FOREIGN KEY(serveur_id) REFERENCES users(id)
+    )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_held_orders_serveur ON held_orders(serveur_id)"
+    )
+
+
+MIGRATIONS: List[Tuple[int, Callable[..., None]]] = [
+    (1, _add_indexes),
+    (2, _money_to_cents),
+    (3, _sales_summaries),
+    (4, _order_uids),
+    (5, _hash_passwords),
+    (6, _user_pins),
+    (7, _held_orders),
+]
+
+# Calculs coûteux d'une étape, faits avant sa transaction pour ne pas garder
+# le verrou d'écriture pendant ce temps ; le résultat est passé à l'étape.
+PREPARE: Dict[int, Callable[[sqlite3.Connection], Any]] = {
+    5: _hash_plain_passwords,
+}
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Applique dans l'ordre les étapes manquantes et renvoie la version finale."""
+    version = get_version(conn)
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        prepare = PREPARE.get(target)
+        args = (prepare(conn),) if prepare else ()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Sinon, étape déjà faite par un autre processus pendant la préparation.
+            if get_version(conn) < target:
+                step(conn, *args)
+                conn.execute(f"PRAGMA user_version={target}")
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        version = target
+    return version
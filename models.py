@@ -1,22 +1,52 @@
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from database import get_conn
+from cart import Cart
+from database import get_conn, transaction
+from money import Money
+from utils.auth import (
+    LoginThrottle,
+    dummy_verify,
+    hash_password,
+    hash_pin,
+    needs_rehash,
+    verify_password,
+)
+
+
+# Limite les essais de mots de passe par identifiant (utils.auth).
+login_throttle = LoginThrottle()
 
 
 def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """Utilisateur si le mot de passe est correct, sinon None.
+
+    Lève TooManyAttempts après trop d'échecs récents pour cet identifiant.
+    """
+    login_throttle.check(username)
     conn = get_conn()
     c = conn.cursor()
     c.execute(
-        "SELECT id, username, role FROM users WHERE username=? AND password=?",
-        (username, password),
+        "SELECT id, username, password, role FROM users WHERE username=?",
+        (username,),
     )
     row = c.fetchone()
-    conn.close()
-    if row:
-        user_id, uname, role = row
-        return {"id": user_id, "username": uname, "role": role}
-    return None
+    if row is None:
+        dummy_verify(password)
+    if row is None or not verify_password(password, row[2]):
+        login_throttle.failed(username)
+        return None
+    login_throttle.succeeded(username)
+    user_id, uname, stored, role = row
+    if needs_rehash(stored):
+        # Coût modifié (CAFE_PASSWORD_ITERATIONS) : nouvelle empreinte.
+        hashed = hash_password(password)
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE users SET password=? WHERE id=?", (hashed, user_id),
+            )
+    return {"id": user_id, "username": uname, "role": role}
 
 
 def get_all_servers(include_admin: bool = False) -> List[Dict[str, Any]]:
@@ -29,59 +59,136 @@ def get_all_servers(include_admin: bool = False) -> List[Dict[str, Any]]:
             "SELECT id, username, role FROM users WHERE role != 'admin' ORDER BY username"
         )
     rows = c.fetchall()
-    conn.close()
     return [
         {"id": r[0], "username": r[1], "role": r[2]}
         for r in rows
     ]
 
 
-def create_server(username: str, password: str, role: str = "serveur") -> None:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-        (username, password, role),
-    )
-    conn.commit()
-    conn.close()
+def get_user(user_id: int) -> Optional[Dict[str, Any]]:
+    c = get_conn().cursor()
+    c.execute("SELECT id, username, role FROM users WHERE id=?", (user_id,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "username": row[1], "role": row[2]}
+
+
+def create_server(username: str, password: str, role: str = "serveur") -> int:
+    """Crée le compte et renvoie son id.
+
+    Lève sqlite3.IntegrityError si le nom d'utilisateur existe déjà.
+    """
+    hashed = hash_password(password)  # hors transaction : la dérivation est lente
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+            (username, hashed, role),
+        )
+        return c.lastrowid
 
 
 def update_server(user_id: int, username: str, password: str) -> None:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute(
-        "UPDATE users SET username=?, password=? WHERE id=?",
-        (username, password, user_id),
-    )
-    conn.commit()
-    conn.close()
+    """Lève sqlite3.IntegrityError si le nom d'utilisateur est pris par un autre compte."""
+    hashed = hash_password(password)
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE users SET username=?, password=? WHERE id=?",
+            (username, hashed, user_id),
+        )
+    invalidate_pin_users()
 
 
 def delete_server(user_id: int) -> bool:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT role FROM users WHERE id=?", (user_id,))
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return False
-    role = row[0]
-    if role == "admin":
-        conn.close()
-        return False
-    c.execute("DELETE FROM users WHERE id=?", (user_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("SELECT role FROM users WHERE id=?", (user_id,))
+        row = c.fetchone()
+        if not row:
+            return False
+        role = row[0]
+        if role == "admin":
+            return False
+        c.execute("DELETE FROM users WHERE id=?", (user_id,))
+        c.execute("DELETE FROM held_orders WHERE serveur_id=?", (user_id,))
+    invalidate_pin_users()
     return True
 
 
+# Serveurs ayant un code PIN, gardés en mémoire : un changement de serveur à
+# la caisse ne relit pas la base. Rechargés après chaque modification.
+_pin_users: Optional[Dict[int, Dict[str, Any]]] = None
+_pin_users_lock = threading.Lock()
+pin_throttle = LoginThrottle()
+
+
+def _load_pin_users() -> Dict[int, Dict[str, Any]]:
+    c = get_conn().cursor()
+    c.execute(
+        "SELECT id, username, role, pin FROM users "
+        "WHERE pin IS NOT NULL AND role != 'admin' ORDER BY username"
+    )
+    return {
+        r[0]: {"id": r[0], "username": r[1], "role": r[2], "pin": r[3]}
+        for r in c.fetchall()
+    }
+
+
+def _get_pin_users() -> Dict[int, Dict[str, Any]]:
+    global _pin_users
+    users = _pin_users
+    if users is None:
+        with _pin_users_lock:
+            if _pin_users is None:
+                _pin_users = _load_pin_users()
+            users = _pin_users
+    return users
+
+
+def invalidate_pin_users() -> None:
+    global _pin_users
+    with _pin_users_lock:
+        _pin_users = None
+
+
+def get_pin_users() -> List[Dict[str, Any]]:
+    """Serveurs pouvant prendre la caisse avec leur code PIN (sans l'empreinte)."""
+    return [
+        {"id": u["id"], "username": u["username"], "role": u["role"]}
+        for u in _get_pin_users().values()
+    ]
+
+
+def set_user_pin(user_id: int, pin: Optional[str]) -> None:
+    """Définit (ou retire, avec None) le code PIN d'un serveur."""
+    hashed = hash_pin(pin) if pin else None
+    with transaction() as conn:
+        conn.execute("UPDATE users SET pin=? WHERE id=?", (hashed, user_id))
+    invalidate_pin_users()
+
+
+def authenticate_pin(user_id: int, pin: str) -> Optional[Dict[str, Any]]:
+    """Serveur `user_id` si le PIN est correct, sinon None (sans accès à la base).
+
+    Lève TooManyAttempts après trop d'échecs récents pour ce serveur.
+    """
+    key = str(user_id)
+    pin_throttle.check(key)
+    user = _get_pin_users().get(user_id)
+    if user is None or not verify_password(pin, user["pin"]):
+        pin_throttle.failed(key)
+        return None
+    pin_throttle.succeeded(key)
+    return {"id": user["id"], "username": user["username"], "role": user["role"]}
+
+
 def get_categories() -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
     c.execute("SELECT id, name FROM categories ORDER BY name")
     rows = c.fetchall()
-    conn.close()
     return [
         {"id": r[0], "name": r[1]}
         for r in rows
@@ -89,32 +196,28 @@ def get_categories() -> List[Dict[str, Any]]:
 
 
 def create_category(name: str) -> None:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO categories (name) VALUES (?)", (name,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+    invalidate_catalog()
 
 
 def update_category(category_id: int, name: str) -> None:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("UPDATE categories SET name=? WHERE id=?", (name, category_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("UPDATE categories SET name=? WHERE id=?", (name, category_id))
+    invalidate_catalog()
 
 
 def delete_category(category_id: int) -> bool:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM products WHERE category_id=?", (category_id,))
-    row = c.fetchone()
-    if row and row[0] > 0:
-        conn.close()
-        return False
-    c.execute("DELETE FROM categories WHERE id=?", (category_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM products WHERE category_id=?", (category_id,))
+        row = c.fetchone()
+        if row and row[0] > 0:
+            return False
+        c.execute("DELETE FROM categories WHERE id=?", (category_id,))
+    invalidate_catalog()
     return True
 
 
@@ -122,94 +225,434 @@ def get_products_by_category(category_id: int) -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
     c.execute(
-        "SELECT id, name, price FROM products WHERE category_id=? ORDER BY name",
+        "SELECT id, name, price_cents FROM products WHERE category_id=? ORDER BY name",
         (category_id,),
     )
     rows = c.fetchall()
-    conn.close()
     return [
-        {"id": r[0], "name": r[1], "price": r[2]}
+        {"id": r[0], "name": r[1], "price": Money(r[2])}
+        for r in rows
+    ]
+
+
+def create_product(name: str, price: Money, category_id: int) -> None:
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO products (name, price_cents, category_id) VALUES (?, ?, ?)",
+            (name, price.cents, category_id),
+        )
+    invalidate_catalog()
+
+
+def update_product(product_id: int, name: str, price: Money, category_id: int) -> None:
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE products SET name=?, price_cents=?, category_id=? WHERE id=?",
+            (name, price.cents, category_id, product_id),
+        )
+    invalidate_catalog()
+
+
+def delete_product(product_id: int) -> None:
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM products WHERE id=?", (product_id,))
+    invalidate_catalog()
+
+
+# Catalogue du menu (catégories + produits) gardé en mémoire pour la caisse.
+# Il est rechargé au premier accès après chaque modification du menu.
+_catalog: Optional[Dict[str, Any]] = None
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> Dict[str, Any]:
+    categories = get_categories()
+    products: Dict[int, Dict[str, Any]] = {}
+    by_category: Dict[int, List[Dict[str, Any]]] = {c["id"]: [] for c in categories}
+    c = get_conn().cursor()
+    c.execute("SELECT id, name, price_cents, category_id FROM products ORDER BY name")
+    for r in c.fetchall():
+        product = {"id": r[0], "name": r[1], "price": Money(r[2]), "category_id": r[3]}
+        products[r[0]] = product
+        by_category.setdefault(r[3], []).append(product)
+    return {"categories": categories, "products": products, "by_category": by_category}
+
+
+def get_catalog() -> Dict[str, Any]:
+    global _catalog
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = _load_catalog()
+            catalog = _catalog
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def get_cached_categories() -> List[Dict[str, Any]]:
+    return get_catalog()["categories"]
+
+
+def get_cached_products_by_category(category_id: int) -> List[Dict[str, Any]]:
+    return get_catalog()["by_category"].get(category_id, [])
+
+
+def get_cached_product(product_id: int) -> Optional[Dict[str, Any]]:
+    return get_catalog()["products"].get(product_id)
+
+
+def order_data(order_id: int, serveur_id: int, cart: Cart, date_str: str) -> Dict[str, Any]:
+    """Commande telle que la renvoie create_order (aussi utilisée par journal.py)."""
+    return {
+        "id": order_id,
+        "serveur_id": serveur_id,
+        "total": cart.total,
+        "date": date_str,
+        "items": [
+            {
+                "product_id": line.product_id,
+                "name": line.name,
+                "qty": line.qty,
+                "price": line.price,
+                "total": line.total,
+            }
+            for line in cart
+        ],
+    }
+
+
+def _insert_order(
+    c: Any,
+    serveur_id: int,
+    cart: Cart,
+    date_str: str,
+    order_id: Optional[int] = None,
+    uid: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[Tuple[int, int, int, int]]]:
+    c.execute(
+        "INSERT INTO orders (id, uid, serveur_id, total_cents, date) VALUES (?, ?, ?, ?, ?)",
+        (order_id, uid, serveur_id, cart.total_cents, date_str),
+    )
+    order = order_data(c.lastrowid, serveur_id, cart, date_str)
+    rows = [
+        (order["id"], line.product_id, line.qty, line.price_cents)
+        for line in cart
+    ]
+    return order, rows
+
+
+def create_order(
+    serveur_id: int,
+    cart: Cart,
+    date_str: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Enregistre une commande et renvoie ses données (id, total, date, lignes)."""
+    return create_orders([
+        {"serveur_id": serveur_id, "cart": cart, "date": date_str},
+    ])[0]
+
+
+def create_orders(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Enregistre plusieurs commandes en une seule transaction.
+
+    Chaque entrée contient "serveur_id", "cart" et éventuellement "date"
+    (ventes saisies hors ligne) ; sinon l'heure courante est utilisée.
+    Les commandes du journal (journal.py) portent aussi leur "id" et leur "uid".
+    """
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    created = []
+    rows: List[Tuple[int, int, int, int]] = []
+    with transaction(immediate=True) as conn:
+        c = conn.cursor()
+        for o in orders:
+            order, order_rows = _insert_order(
+                c,
+                o["serveur_id"],
+                o["cart"],
+                o.get("date") or now_str,
+                o.get("id"),
+                o.get("uid"),
+            )
+            created.append(order)
+            rows.extend(order_rows)
+        c.executemany(
+            "INSERT INTO order_items (order_id, product_id, qty, price_cents) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+    return created
+
+
+def get_held_orders(serveur_id: int) -> List[Dict[str, Any]]:
+    """Commandes en attente du serveur ; "lines" est au format de Cart.pack()."""
+    c = get_conn().cursor()
+    c.execute(
+        "SELECT id, label, lines, updated FROM held_orders WHERE serveur_id=? ORDER BY id",
+        (serveur_id,),
+    )
+    return [
+        {"id": r[0], "label": r[1], "lines": r[2], "updated": r[3]}
+        for r in c.fetchall()
+    ]
+
+
+def save_held_order(
+    serveur_id: int,
+    label: str,
+    lines: bytes,
+    held_id: Optional[int] = None,
+) -> int:
+    """Crée (held_id None) ou met à jour une commande en attente et renvoie son id."""
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with transaction() as conn:
+        c = conn.cursor()
+        if held_id is not None:
+            c.execute(
+                "UPDATE held_orders SET serveur_id=?, label=?, lines=?, updated=? WHERE id=?",
+                (serveur_id, label, lines, now_str, held_id),
+            )
+            if c.rowcount:
+                return held_id
+        c.execute(
+            "INSERT INTO held_orders (serveur_id, label, lines, updated) VALUES (?, ?, ?, ?)",
+            (serveur_id, label, lines, now_str),
+        )
+        return c.lastrowid
+
+
+def delete_held_order(held_id: int) -> None:
+    with transaction() as conn:
+        conn.execute("DELETE FROM held_orders WHERE id=?", (held_id,))
+
+
+def day_range(start_date: str, end_date: str) -> Tuple[str, str]:
+    """Bornes [début, lendemain de la fin) comparables directement à orders.date.
+
+    orders.date est stocké en texte "YYYY-MM-DD HH:MM:SS" : la comparaison
+    lexicographique suffit et laisse SQLite utiliser l'index idx_orders_date.
+    """
+    next_day = date.fromisoformat(end_date) + timedelta(days=1)
+    return start_date, next_day.isoformat()
+
+
+def get_orders_between_dates(start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT o.id, o.total_cents, o.date, IFNULL(u.username, '?')
+        FROM orders o
+        LEFT JOIN users u ON o.serveur_id = u.id
+        WHERE o.date >= ? AND o.date < ?
+        ORDER BY o.date
+        """,
+        day_range(start_date, end_date),
+    )
+    rows = c.fetchall()
+    return [
+        {"id": r[0], "total": Money(r[1]), "date": r[2], "serveur": r[3]}
         for r in rows
     ]
 
 
-def create_product(name: str, price: float, category_id: int) -> None:
+def iter_orders(
+    start_date: str,
+    end_date: str,
+    after: Optional[Tuple[str, int]] = None,
+    limit: int = 200,
+    chunk_size: int = 50,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Commandes triées par (date, id) à partir du curseur `after`, par morceaux.
+
+    Le curseur est le couple (date, id) de la dernière commande déjà lue :
+    chaque page est une recherche dans l'index, quelle que soit sa position.
+    Les commandes d'un serveur supprimé sont incluses (serveur "?"), comme
+    dans les totaux de sales_daily.
+    """
+    start, end = day_range(start_date, end_date)
+    after_date, after_id = after or ("", 0)
     conn = get_conn()
     c = conn.cursor()
+    # La borne basse de l'index est la plus grande des deux dates : SQLite ne
+    # se sert pas de la comparaison de couples pour positionner la recherche.
     c.execute(
-        "INSERT INTO products (name, price, category_id) VALUES (?, ?, ?)",
-        (name, price, category_id),
+        """
+        SELECT o.id, o.total_cents, o.date, IFNULL(u.username, '?')
+        FROM orders o
+        LEFT JOIN users u ON o.serveur_id = u.id
+        WHERE o.date >= ? AND o.date < ? AND (o.date, o.id) > (?, ?)
+        ORDER BY o.date, o.id
+        LIMIT ?
+        """,
+        (max(start, after_date), end, after_date, after_id, limit),
     )
-    conn.commit()
-    conn.close()
+    while True:
+        rows = c.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield [
+            {"id": r[0], "total": Money(r[1]), "date": r[2], "serveur": r[3]}
+            for r in rows
+        ]
+
+
+def get_orders_page(
+    start_date: str,
+    end_date: str,
+    after: Optional[Tuple[str, int]] = None,
+    limit: int = 200,
+) -> List[Dict[str, Any]]:
+    """Page de commandes triées par (date, id), à partir du curseur `after`."""
+    return [
+        order
+        for chunk in iter_orders(start_date, end_date, after, limit, max(limit, 1))
+        for order in chunk
+    ]
+
+
+def get_orders_total(start_date: str, end_date: str) -> Money:
+    """Total exact de la période, lu dans les totaux journaliers (sales_daily)."""
+    return get_sales_summary(start_date, end_date)["total"]
 
 
-def update_product(product_id: int, name: str, price: float, category_id: int) -> None:
+def get_sales_summary(start_date: str, end_date: str) -> Dict[str, Any]:
     conn = get_conn()
     c = conn.cursor()
     c.execute(
-        "UPDATE products SET name=?, price=?, category_id=? WHERE id=?",
-        (name, price, category_id, product_id),
+        """
+        SELECT IFNULL(SUM(orders_count), 0), IFNULL(SUM(total_cents), 0)
+        FROM sales_daily
+        WHERE day BETWEEN ? AND ?
+        """,
+        (start_date, end_date),
     )
-    conn.commit()
-    conn.close()
+    row = c.fetchone()
+    return {"orders_count": row[0], "total": Money(row[1])}
 
 
-def delete_product(product_id: int) -> None:
+def get_sales_by_server(start_date: str, end_date: str) -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
-    c.execute("DELETE FROM products WHERE id=?", (product_id,))
-    conn.commit()
-    conn.close()
+    c.execute(
+        """
+        SELECT s.serveur_id, IFNULL(u.username, '?'), SUM(s.orders_count), SUM(s.total_cents)
+        FROM sales_daily s
+        LEFT JOIN users u ON u.id = s.serveur_id
+        WHERE s.day BETWEEN ? AND ?
+        GROUP BY s.serveur_id
+        ORDER BY SUM(s.total_cents) DESC
+        """,
+        (start_date, end_date),
+    )
+    rows = c.fetchall()
+    return [
+        {"serveur_id": r[0], "serveur": r[1], "orders_count": r[2], "total": Money(r[3])}
+        for r in rows
+    ]
 
 
-def create_order(serveur_id: int, cart: Dict[int, Dict[str, Any]]) -> int:
-    total = sum(item["price"] * item["qty"] for item in cart.values())
+def get_sales_by_hour(start_date: str, end_date: str) -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     c.execute(
-        "INSERT INTO orders (serveur_id, total, date) VALUES (?, ?, ?)",
-        (serveur_id, total, now_str),
+        """
+        SELECT hour, SUM(orders_count), SUM(total_cents)
+        FROM sales_hourly
+        WHERE day BETWEEN ? AND ?
+        GROUP BY hour
+        ORDER BY hour
+        """,
+        (start_date, end_date),
     )
-    order_id = c.lastrowid
-    for product_id, item in cart.items():
-        c.execute(
-            "INSERT INTO order_items (order_id, product_id, qty, price) VALUES (?, ?, ?, ?)",
-            (order_id, product_id, item["qty"], item["price"]),
-        )
-    conn.commit()
-    conn.close()
-    return order_id
+    rows = c.fetchall()
+    return [
+        {"hour": r[0], "orders_count": r[1], "total": Money(r[2])}
+        for r in rows
+    ]
 
 
-def get_orders_between_dates(start_date: str, end_date: str) -> List[Dict[str, Any]]:
+def get_sales_by_product(start_date: str, end_date: str) -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
     c.execute(
         """
-        SELECT o.id, o.total, o.date, u.username
-        FROM orders o
-        JOIN users u ON o.serveur_id = u.id
-        WHERE date(o.date) BETWEEN ? AND ?
-        ORDER BY o.date
+        SELECT s.product_id, IFNULL(p.name, '?'), SUM(s.qty), SUM(s.total_cents)
+        FROM sales_product_daily s
+        LEFT JOIN products p ON p.id = s.product_id
+        WHERE s.day BETWEEN ? AND ?
+        GROUP BY s.product_id
+        ORDER BY SUM(s.total_cents) DESC
+        """,
+        (start_date, end_date),
+    )
+    rows = c.fetchall()
+    return [
+        {"product_id": r[0], "name": r[1], "qty": r[2], "total": Money(r[3])}
+        for r in rows
+    ]
+
+
+def get_sales_by_category(start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT s.category_id, IFNULL(cat.name, '?'), SUM(s.qty), SUM(s.total_cents)
+        FROM sales_category_daily s
+        LEFT JOIN categories cat ON cat.id = s.category_id
+        WHERE s.day BETWEEN ? AND ?
+        GROUP BY s.category_id
+        ORDER BY SUM(s.total_cents) DESC
         """,
         (start_date, end_date),
     )
     rows = c.fetchall()
-    conn.close()
     return [
-        {"id": r[0], "total": r[1], "date": r[2], "serveur": r[3]}
+        {"category_id": r[0], "name": r[1], "qty": r[2], "total": Money(r[3])}
         for r in rows
     ]
 
 
+def get_order(order_id: int) -> Optional[Dict[str, Any]]:
+    """Relit une commande complète (réimpression d'un ticket)."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT o.id, o.serveur_id, o.total_cents, o.date, IFNULL(u.username, '?')
+        FROM orders o
+        LEFT JOIN users u ON o.serveur_id = u.id
+        WHERE o.id=?
+        """,
+        (order_id,),
+    )
+    row = c.fetchone()
+    if not row:
+        return None
+    return {
+        "id": row[0],
+        "serveur_id": row[1],
+        "total": Money(row[2]),
+        "date": row[3],
+        "serveur": row[4],
+        "items": get_order_items(order_id),
+    }
+
+
 def get_order_items(order_id: int) -> List[Dict[str, Any]]:
     conn = get_conn()
     c = conn.cursor()
     c.execute(
         """
-        SELECT p.name, oi.qty, oi.price
+        SELECT p.name, oi.qty, oi.price_cents
         FROM order_items oi
         JOIN products p ON oi.product_id = p.id
         WHERE oi.order_id=?
@@ -217,39 +660,67 @@ def get_order_items(order_id: int) -> List[Dict[str, Any]]:
         (order_id,),
     )
     rows = c.fetchall()
-    conn.close()
     return [
-        {"name": r[0], "qty": r[1], "price": r[2], "total": r[1] * r[2]}
+        {"name": r[0], "qty": r[1], "price": Money(r[2]), "total": Money(r[1] * r[2])}
         for r in rows
     ]
 
 
+def get_order_items_many(order_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Détails de plusieurs commandes en une requête par lot de 500 ids."""
+    result: Dict[int, List[Dict[str, Any]]] = {oid: [] for oid in order_ids}
+    conn = get_conn()
+    c = conn.cursor()
+    for offset in range(0, len(order_ids), 500):
+        chunk = order_ids[offset:offset + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        c.execute(
+            f"""
+            SELECT oi.order_id, p.name, oi.qty, oi.price_cents
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.id
+            WHERE oi.order_id IN ({placeholders})
+            ORDER BY oi.order_id, oi.id
+            """,
+            chunk,
+        )
+        for r in c.fetchall():
+            result[r[0]].append(
+                {"name": r[1], "qty": r[2], "price": Money(r[3]), "total": Money(r[2] * r[3])}
+            )
+    return result
+
+
+_cafe_name: Optional[str] = None
+
+
 def get_cafe_name() -> str:
+    global _cafe_name
+    if _cafe_name is not None:
+        return _cafe_name
     conn = get_conn()
     c = conn.cursor()
     c.execute("SELECT cafe_name FROM settings ORDER BY id LIMIT 1")
     row = c.fetchone()
-    conn.close()
-    if row and row[0]:
-        return row[0]
-    return "Café Caisse Manager"
+    _cafe_name = row[0] if row and row[0] else "Café Caisse Manager"
+    return _cafe_name
 
 
 def update_cafe_name(new_name: str) -> None:
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id FROM settings ORDER BY id LIMIT 1")
-    row = c.fetchone()
-    if row:
-        settings_id = row[0]
-        c.execute(
-            "UPDATE settings SET cafe_name=? WHERE id=?",
-            (new_name, settings_id),
-        )
-    else:
-        c.execute(
-            "INSERT INTO settings (cafe_name) VALUES (?)",
-            (new_name,),
-        )
-    conn.commit()
-    conn.close()
+    global _cafe_name
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id FROM settings ORDER BY id LIMIT 1")
+        row = c.fetchone()
+        if row:
+            settings_id = row[0]
+            c.execute(
+                "UPDATE settings SET cafe_name=? WHERE id=?",
+                (new_name, settings_id),
+            )
+        else:
+            c.execute(
+                "INSERT INTO settings (cafe_name) VALUES (?)",
+                (new_name,),
+            )
+    _cafe_name = None
@@ -0,0 +1,85 @@
+# money.py
+"""Montants en centimes entiers (dirhams) : additions et totaux exacts."""
+from typing import Any, Union
+
+
+class Money:
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0) -> None:
+        self.cents = int(cents)
+
+    @classmethod
+    def from_float(cls, amount: float) -> "Money":
+        return cls(round(amount * 100))
+
+    @classmethod
+    def parse(cls, text: str) -> "Money":
+        """Lit une saisie utilisateur ("12", "12.5", "12,50") ; ValueError sinon."""
+        text = text.strip().replace(",", ".")
+        negative = text.startswith("-")
+        units, _, decimals = text.lstrip("+-").partition(".")
+        if not (units or decimals) or not (units + decimals).isdigit() or len(decimals) > 2:
+            raise ValueError(f"Montant invalide : {text!r}")
+        cents = int(units or 0) * 100 + int(decimals.ljust(2, "0") or 0)
+        return cls(-cents if negative else cents)
+
+    def __str__(self) -> str:
+        units, cents = divmod(abs(self.cents), 100)
+        sign = "-" if self.cents < 0 else ""
+        return f"{sign}{units}.{cents:02d}"
+
+    def __repr__(self) -> str:
+        return f"Money({self.cents})"
+
+    def __format__(self, spec: str) -> str:
+        # ".2f" (format historique des écrans) donne la valeur exacte.
+        if spec in ("", ".2f"):
+            return str(self)
+        return format(self.cents / 100, spec)
+
+    def __float__(self) -> float:
+        return self.cents / 100
+
+    def __bool__(self) -> bool:
+        return self.cents != 0
+
+    def __hash__(self) -> int:
+        return hash(self.cents)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other: "Money") -> bool:
+        return self.cents < other.cents
+
+    def __le__(self, other: "Money") -> bool:
+        return self.cents <= other.cents
+
+    def __add__(self, other: "Money") -> "Money":
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        return NotImplemented
+
+    def __radd__(self, other: Union[int, "Money"]) -> "Money":
+        # Permet sum(montants), qui commence par l'entier 0.
+        if other == 0:
+            return self
+        return self.__add__(other)  # type: ignore[arg-type]
+
+    def __sub__(self, other: "Money") -> "Money":
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self) -> "Money":
+        return Money(-self.cents)
+
+    def __mul__(self, qty: int) -> "Money":
+        if isinstance(qty, int):
+            return Money(self.cents * qty)
+        return NotImplemented
+
+    __rmul__ = __mul__
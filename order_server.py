@@ -0,0 +1,398 @@
+# order_server.py
+"""Serveur de commandes partagé par plusieurs caisses (mode multi-postes).
+
+Protocole : HTTP/1.1 et JSON, connexions persistantes (voir store.RemoteStore).
+    GET  /catalog   catégories, produits (prix en centimes), nom du café et
+                    serveurs pouvant prendre la caisse avec un code PIN
+    POST /login     {"username", "password"} -> utilisateur, 401, ou 429 après
+                    trop d'échecs pour cet identifiant
+    POST /pin       {"user_id", "pin"} -> utilisateur, 401 ou 429 (changement
+                    rapide de serveur)
+    POST /held/list   {"serveur_id"} -> {"held": [...]} commandes en attente
+    POST /held/save   {"id"?, "serveur_id", "label", "lines"} -> {"id"}
+    POST /held/delete {"id"}
+                    (lignes au format de Cart.pack(), en base64)
+    POST /orders    {"serveur_id", "lines": [[product_id, qty], ...]}
+                    -> commande enregistrée (prix du catalogue du serveur)
+
+Le serveur écoute par défaut sur 127.0.0.1. Pour le rendre accessible aux
+autres caisses (--host 0.0.0.0), un jeton partagé est obligatoire : --token
+ou CAFE_SERVER_TOKEN sur le serveur, CAFE_SERVER_TOKEN sur chaque caisse.
+Toute requête sans l'en-tête "Authorization: Bearer <jeton>" reçoit 403.
+
+Les lectures passent par un petit groupe de threads qui gardent chacun leur
+connexion SQLite ouverte. Les commandes sont enregistrées par un thread
+d'écriture unique qui regroupe en une transaction celles arrivées pendant
+l'écriture du lot précédent (order_writer.OrderWriter) : les caisses ne se
+disputent pas le verrou d'écriture de SQLite.
+
+Usage : python -m order_server [--host 0.0.0.0 --token JETON] [--port 8765]
+                              [--db cafe.db]
+"""
+import argparse
+import asyncio
+import functools
+import hmac
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import database
+import models
+from cart import PACKED_LINE, Cart
+from order_writer import OrderWriter
+from store import (
+    DEFAULT_PORT,
+    TOKEN_ENV,
+    held_from_json,
+    held_to_json,
+    order_to_json,
+)
+from utils.auth import TooManyAttempts
+
+MAX_BODY = 1024 * 1024
+# Quantité maximale d'un produit dans une commande reçue.
+MAX_QTY = 1000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# (serveur_id, [(product_id, qty), ...])
+OrderRequest = Tuple[int, List[Tuple[int, int]]]
+
+
+def build_order(request: OrderRequest) -> Dict[str, Any]:
+    """Commande au format de models.create_orders, aux prix du catalogue du serveur."""
+    serveur_id, lines = request
+    if models.get_user(serveur_id) is None:
+        raise HTTPError(400, f"Serveur inconnu : {serveur_id}")
+    cart = Cart()
+    for product_id, qty in lines:
+        product = models.get_cached_product(product_id)
+        if product is None:
+            raise HTTPError(400, f"Produit inconnu : {product_id}")
+        cart.add(product_id, product["name"], product["price"], qty)
+    return {"serveur_id": serveur_id, "cart": cart}
+
+
+class OrderServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        readers: int = 4,
+        batch_delay: float = 0.0,
+        max_batch: int = 500,
+        token: Optional[str] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.token = token
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        # Chaque thread garde sa connexion SQLite (database.get_conn).
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="order-read")
+        self.writer = OrderWriter(max_delay=batch_delay, max_batch=max_batch)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.writer.start()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:  # type: ignore[union-attr]
+            await self._server.serve_forever()  # type: ignore[union-attr]
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, functools.partial(fn, *args))
+
+    async def _handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": e.message}, False)
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                method, path, authorization, body, keep_alive = request
+                try:
+                    self._check_token(authorization)
+                    status, payload = 200, await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(
+        self,
+        reader: asyncio.StreamReader,
+    ) -> Optional[Tuple[str, str, str, bytes, bool]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Requête invalide") from None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(400, "Content-Length invalide") from None
+        if length < 0:
+            raise HTTPError(400, "Content-Length invalide")
+        if length > MAX_BODY:
+            raise HTTPError(413, "Requête trop volumineuse")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (
+            version == "HTTP/1.1" or connection == "keep-alive"
+        )
+        return method, path, headers.get("authorization", ""), body, keep_alive
+
+    def _check_token(self, authorization: str) -> None:
+        if self.token is None:
+            return
+        if not hmac.compare_digest(
+            authorization.encode("utf-8"), f"Bearer {self.token}".encode("utf-8"),
+        ):
+            raise HTTPError(403, "Jeton du serveur de commandes manquant ou invalide")
+
+    def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        keep_alive: bool,
+    ) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Any:
+        routes = {
+            "/catalog": ("GET", self._catalog),
+            "/login": ("POST", self._login),
+            "/pin": ("POST", self._pin),
+            "/held/list": ("POST", self._held_list),
+            "/held/save": ("POST", self._held_save),
+            "/held/delete": ("POST", self._held_delete),
+            "/orders": ("POST", self._create_order),
+        }
+        route = routes.get(path)
+        if route is None:
+            raise HTTPError(404, f"Chemin inconnu : {path}")
+        expected, handler = route
+        if method != expected:
+            raise HTTPError(405, f"{path} attend {expected}")
+        data = None
+        if method == "POST":
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "JSON invalide") from None
+        return await handler(data)
+
+    async def _catalog(self, data: Any) -> Dict[str, Any]:
+        return await self._run(self._load_catalog)
+
+    def _load_catalog(self) -> Dict[str, Any]:
+        # Le menu et les codes PIN ont pu être modifiés depuis un autre
+        # processus (fenêtre d'administration) : on les relit à chaque
+        # ouverture de caisse.
+        models.invalidate_catalog()
+        models.invalidate_pin_users()
+        catalog = models.get_catalog()
+        return {
+            "categories": catalog["categories"],
+            "products": [
+                dict(p, price=p["price"].cents) for p in catalog["products"].values()
+            ],
+            "cafe_name": models.get_cafe_name(),
+            "pin_users": models.get_pin_users(),
+        }
+
+    async def _login(self, data: Any) -> Dict[str, Any]:
+        try:
+            username, password = str(data["username"]), str(data["password"])
+        except (KeyError, TypeError):
+            raise HTTPError(400, "username et password requis") from None
+        try:
+            user = await self._run(models.authenticate_user, username, password)
+        except TooManyAttempts as e:
+            raise HTTPError(429, str(e)) from None
+        if user is None:
+            raise HTTPError(401, "Identifiants incorrects")
+        return user
+
+    async def _pin(self, data: Any) -> Dict[str, Any]:
+        try:
+            user_id, pin = int(data["user_id"]), str(data["pin"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "user_id et pin requis") from None
+        try:
+            user = await self._run(models.authenticate_pin, user_id, pin)
+        except TooManyAttempts as e:
+            raise HTTPError(429, str(e)) from None
+        if user is None:
+            raise HTTPError(401, "Code PIN incorrect")
+        return user
+
+    async def _held_list(self, data: Any) -> Dict[str, Any]:
+        try:
+            serveur_id = int(data["serveur_id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "serveur_id requis") from None
+        held = await self._run(models.get_held_orders, serveur_id)
+        return {"held": [held_to_json(h) for h in held]}
+
+    async def _held_save(self, data: Any) -> Dict[str, Any]:
+        try:
+            held = held_from_json(data)
+            held_id = None if held.get("id") is None else int(held["id"])
+            args = (int(held["serveur_id"]), str(held["label"]), held["lines"], held_id)
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "Commande en attente invalide") from None
+        if not args[2] or len(args[2]) % PACKED_LINE.size:
+            raise HTTPError(400, "Lignes de commande en attente invalides")
+        return {"id": await self._run(models.save_held_order, *args)}
+
+    async def _held_delete(self, data: Any) -> Dict[str, Any]:
+        try:
+            held_id = int(data["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "id requis") from None
+        await self._run(models.delete_held_order, held_id)
+        return {}
+
+    async def _create_order(self, data: Any) -> Dict[str, Any]:
+        try:
+            request: OrderRequest = (
+                int(data["serveur_id"]),
+                [(int(pid), int(qty)) for pid, qty in data["lines"]],
+            )
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "Commande invalide") from None
+        if not request[1] or any(not 0 < qty <= MAX_QTY for _, qty in request[1]):
+            raise HTTPError(400, "Commande vide ou quantité invalide")
+
+        order = await self._run(build_order, request)
+        created = await asyncio.wrap_future(self.writer.submit(order))
+        return order_to_json(created)
+
+
+def start_in_thread(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    token: Optional[str] = None,
+) -> OrderServer:
+    """Démarre un serveur dans un thread de fond (mode local, CAFE_SERVER=local)."""
+    server = OrderServer(host, port, token=token)
+    started = threading.Event()
+    errors: List[BaseException] = []
+
+    async def run() -> None:
+        try:
+            await server.start()
+        except BaseException as e:
+            errors.append(e)
+            return
+        finally:
+            started.set()
+        await server.serve_forever()
+
+    threading.Thread(
+        target=asyncio.run, args=(run(),), name="order-server", daemon=True,
+    ).start()
+    started.wait()
+    if errors:
+        raise errors[0]
+    return server
+
+
+def is_loopback(host: str) -> bool:
+    return host in ("127.0.0.1", "::1", "localhost")
+
+
+def server_token(host: str, token: Optional[str]) -> Optional[str]:
+    """Jeton donné ou celui de CAFE_SERVER_TOKEN ; ValueError s'il manque hors de 127.0.0.1."""
+    token = token or os.environ.get(TOKEN_ENV) or None
+    if token is None and not is_loopback(host):
+        raise ValueError(f"--token (ou {TOKEN_ENV}) est obligatoire pour écouter sur {host}")
+    return token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serveur de commandes multi-caisses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--token", help=f"jeton partagé avec les caisses (ou {TOKEN_ENV})")
+    parser.add_argument("--db", default=database.DB_NAME, help="fichier de la base")
+    parser.add_argument("--readers", type=int, default=4, help="threads de lecture")
+    args = parser.parse_args()
+    try:
+        token = server_token(args.host, args.token)
+    except ValueError as e:
+        parser.error(str(e))
+    database.DB_NAME = args.db
+    database.init_db()
+    server = OrderServer(args.host, args.port, readers=args.readers, token=token)
+    print(f"Serveur de commandes sur {args.host}:{args.port} (base {args.db})")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# order_writer.py
+"""Écriture groupée des commandes (group commit) par un thread unique.
+
+Les appelants déposent leurs commandes et reçoivent un Future. Le thread
+d'écriture prend toutes les commandes arrivées pendant qu'il écrivait le lot
+précédent et les enregistre en une seule transaction (models.create_orders) :
+un seul COMMIT pour tout le lot, au lieu d'une transaction par caisse qui
+se disputent le verrou d'écriture de SQLite.
+
+max_delay permet en plus d'attendre un peu après la première commande pour
+grossir les lots. Sur un disque rapide le regroupement naturel suffit (0 par
+défaut) ; une attente ne se justifie que si chaque COMMIT coûte cher.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import models
+from cart import Cart
+from database import close_conn
+
+Job = Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]
+
+
+class OrderWriter:
+    def __init__(self, max_delay: float = 0.0, max_batch: int = 500) -> None:
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Enregistre les commandes déjà déposées puis arrête le thread."""
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, order: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        """Dépose une commande au format de models.create_orders."""
+        future: "Future[Dict[str, Any]]" = Future()
+        self._jobs.put((order, future))
+        return future
+
+    def create_order(
+        self,
+        serveur_id: int,
+        cart: Cart,
+        date_str: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Comme models.create_order, mais dans le prochain lot (bloquant)."""
+        return self.submit(
+            {"serveur_id": serveur_id, "cart": cart, "date": date_str}
+        ).result()
+
+    def _next_batch(self) -> Tuple[List[Job], bool]:
+        """Attend une commande, puis ramasse celles déjà déposées (et pendant max_delay).
+
+        Renvoie le lot et True si l'arrêt a été demandé.
+        """
+        first = self._jobs.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    job = self._jobs.get(timeout=timeout)
+                else:
+                    job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _write(self, batch: List[Job]) -> None:
+        pending = [job for job in batch if job[1].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        try:
+            created = models.create_orders([order for order, _ in pending])
+        except sqlite3.OperationalError as e:
+            # Base verrouillée ou indisponible : tout le lot échoue.
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][1].set_exception(e)
+                return
+            # Une commande invalide ne doit pas faire échouer tout le lot :
+            # on reprend une par une pour isoler l'erreur.
+            for order, future in pending:
+                try:
+                    future.set_result(models.create_orders([order])[0])
+                except Exception as err:
+                    future.set_exception(err)
+            return
+        for (_, future), order in zip(pending, created):
+            future.set_result(order)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._write(batch)
+                if stopping:
+                    return
+        finally:
+            close_conn()
@@ -0,0 +1,343 @@
+# store.py
+"""Accès aux données utilisées par la caisse, en local ou via le serveur de commandes.
+
+Par défaut (LocalStore) la caisse lit et écrit directement dans cafe.db.
+Avec plusieurs caisses, l'une d'elles (ou un autre PC) lance
+`python -m order_server` et les autres sont démarrées avec
+CAFE_SERVER=http://<adresse>:8765 : elles passent alors par RemoteStore.
+
+CAFE_SERVER=local démarre le serveur dans le processus même et s'y connecte
+en HTTP : pratique pour essayer le mode multi-postes sur un seul PC.
+CAFE_SERVER_TOKEN donne le jeton partagé exigé par le serveur (voir
+order_server.py).
+"""
+import base64
+import http.client
+import json
+import os
+import sqlite3
+import threading
+import urllib.parse
+from typing import Any, Dict, List, Optional, Tuple
+
+import database
+import models
+from cart import Cart
+from journal import JournalBusy, OrderJournal, journal_path
+from money import Money
+from utils.auth import TooManyAttempts
+
+SERVER_ENV = "CAFE_SERVER"
+TOKEN_ENV = "CAFE_SERVER_TOKEN"
+DEFAULT_PORT = 8765
+
+
+class StoreError(Exception):
+    """Serveur de commandes injoignable ou requête refusée."""
+
+
+def order_to_json(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Commande de models.create_order -> JSON (montants en centimes)."""
+    data = dict(order)
+    data["total"] = order["total"].cents
+    data["items"] = [
+        dict(it, price=it["price"].cents, total=it["total"].cents)
+        for it in order["items"]
+    ]
+    return data
+
+
+def order_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    order = dict(data)
+    order["total"] = Money(data["total"])
+    order["items"] = [
+        dict(it, price=Money(it["price"]), total=Money(it["total"]))
+        for it in data["items"]
+    ]
+    return order
+
+
+def held_to_json(held: Dict[str, Any]) -> Dict[str, Any]:
+    """Commande en attente -> JSON (lignes compactes en base64)."""
+    return dict(held, lines=base64.b64encode(held["lines"]).decode("ascii"))
+
+
+def held_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Lève ValueError (binascii.Error) si les lignes ne sont pas du base64 valide."""
+    return dict(data, lines=base64.b64decode(data["lines"], validate=True))
+
+
+class LocalStore:
+    """Caisse seule : lectures directes dans models.py.
+
+    Les commandes passent par le journal (journal.py) quand il est fourni :
+    le paiement n'attend jamais la base.
+    """
+
+    def __init__(self, journal: Optional[OrderJournal] = None) -> None:
+        self.journal = journal
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.stop()
+
+    def refresh(self) -> None:
+        # Le catalogue de models.py est déjà invalidé à chaque modification.
+        pass
+
+    def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        try:
+            return models.authenticate_user(username, password)
+        except TooManyAttempts as e:
+            raise StoreError(str(e)) from None
+
+    def get_pin_users(self) -> List[Dict[str, Any]]:
+        return models.get_pin_users()
+
+    def authenticate_pin(self, user_id: int, pin: str) -> Optional[Dict[str, Any]]:
+        try:
+            return models.authenticate_pin(user_id, pin)
+        except TooManyAttempts as e:
+            raise StoreError(str(e)) from None
+
+    def get_categories(self) -> List[Dict[str, Any]]:
+        return models.get_cached_categories()
+
+    def get_products_by_category(self, category_id: int) -> List[Dict[str, Any]]:
+        return models.get_cached_products_by_category(category_id)
+
+    def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        return models.get_cached_product(product_id)
+
+    # Base verrouillée ou indisponible : StoreError, comme pour RemoteStore,
+    # pour que la fenêtre de caisse affiche l'erreur au lieu de s'arrêter.
+    def get_held_orders(self, serveur_id: int) -> List[Dict[str, Any]]:
+        try:
+            return models.get_held_orders(serveur_id)
+        except sqlite3.Error as e:
+            raise StoreError(str(e)) from None
+
+    def save_held_order(
+        self,
+        serveur_id: int,
+        label: str,
+        lines: bytes,
+        held_id: Optional[int] = None,
+    ) -> int:
+        try:
+            return models.save_held_order(serveur_id, label, lines, held_id)
+        except sqlite3.Error as e:
+            raise StoreError(str(e)) from None
+
+    def delete_held_order(self, held_id: int) -> None:
+        try:
+            models.delete_held_order(held_id)
+        except sqlite3.Error as e:
+            raise StoreError(str(e)) from None
+
+    def create_order(self, serveur_id: int, cart: Cart) -> Dict[str, Any]:
+        try:
+            if self.journal is not None:
+                return self.journal.append(serveur_id, cart)
+            return models.create_order(serveur_id, cart)
+        except sqlite3.Error as e:
+            raise StoreError(str(e)) from None
+        except OSError as e:
+            # Journal impossible à écrire (disque plein, erreur d'E/S).
+            raise StoreError(f"Journal des commandes inaccessible : {e}") from None
+
+
+class RemoteStore:
+    """Caisse reliée au serveur de commandes (HTTP + JSON, connexion persistante).
+
+    Le catalogue, le nom du café et la liste des serveurs à code PIN sont lus
+    une fois puis gardés en mémoire jusqu'au prochain refresh() (ouverture
+    d'une fenêtre de caisse).
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0, token: Optional[str] = None) -> None:
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or DEFAULT_PORT
+        self.timeout = timeout
+        self.token = token
+        self._local = threading.local()
+        self._catalog: Optional[Dict[str, Any]] = None
+
+    def close(self) -> None:
+        pass
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        retry: bool = True,
+    ) -> Tuple[int, Any]:
+        """Envoie la requête et renvoie (statut HTTP, réponse JSON décodée)."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        # Une seconde tentative sur une nouvelle connexion si la connexion
+        # persistante a été fermée par le serveur entre deux requêtes.
+        attempts = 2 if retry else 1
+        for attempt in range(1, attempts + 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, json.loads(response.read())
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                conn.close()
+                self._local.conn = None
+                if attempt == attempts:
+                    raise StoreError(f"Serveur de commandes injoignable : {e}") from e
+        raise AssertionError("unreachable")
+
+    def _call(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        retry: bool = True,
+    ) -> Any:
+        status, data = self._request(method, path, payload, retry)
+        if status != 200:
+            raise StoreError(data.get("error", f"erreur {status}"))
+        return data
+
+    def refresh(self) -> None:
+        data = self._call("GET", "/catalog")
+        by_category: Dict[int, List[Dict[str, Any]]] = {
+            c["id"]: [] for c in data["categories"]
+        }
+        for p in data["products"]:
+            p["price"] = Money(p["price"])
+            by_category.setdefault(p["category_id"], []).append(p)
+        self._catalog = {
+            "categories": data["categories"],
+            "products": {p["id"]: p for p in data["products"]},
+            "by_category": by_category,
+            "cafe_name": data["cafe_name"],
+            "pin_users": data["pin_users"],
+        }
+
+    def _get_catalog(self) -> Dict[str, Any]:
+        if self._catalog is None:
+            self.refresh()
+        return self._catalog  # type: ignore[return-value]
+
+    def _authenticate(self, path: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        status, data = self._request("POST", path, payload)
+        if status == 401:
+            return None
+        if status != 200:
+            raise StoreError(data.get("error", f"erreur {status}"))
+        return data
+
+    def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        return self._authenticate("/login", {"username": username, "password": password})
+
+    def get_pin_users(self) -> List[Dict[str, Any]]:
+        return self._get_catalog()["pin_users"]
+
+    def authenticate_pin(self, user_id: int, pin: str) -> Optional[Dict[str, Any]]:
+        return self._authenticate("/pin", {"user_id": user_id, "pin": pin})
+
+    def get_categories(self) -> List[Dict[str, Any]]:
+        return self._get_catalog()["categories"]
+
+    def get_products_by_category(self, category_id: int) -> List[Dict[str, Any]]:
+        return self._get_catalog()["by_category"].get(category_id, [])
+
+    def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        return self._get_catalog()["products"].get(product_id)
+
+    def get_held_orders(self, serveur_id: int) -> List[Dict[str, Any]]:
+        data = self._call("POST", "/held/list", {"serveur_id": serveur_id})
+        return [held_from_json(h) for h in data["held"]]
+
+    def save_held_order(
+        self,
+        serveur_id: int,
+        label: str,
+        lines: bytes,
+        held_id: Optional[int] = None,
+    ) -> int:
+        # Une création n'est pas réessayée (elle a pu aboutir malgré la perte
+        # de la réponse) ; une mise à jour peut l'être sans risque.
+        data = self._call(
+            "POST",
+            "/held/save",
+            held_to_json({
+                "id": held_id,
+                "serveur_id": serveur_id,
+                "label": label,
+                "lines": lines,
+            }),
+            retry=held_id is not None,
+        )
+        return data["id"]
+
+    def delete_held_order(self, held_id: int) -> None:
+        self._call("POST", "/held/delete", {"id": held_id})
+
+    def create_order(self, serveur_id: int, cart: Cart) -> Dict[str, Any]:
+        # Pas de nouvel essai automatique : la commande a pu être enregistrée
+        # même si la réponse s'est perdue.
+        data = self._call(
+            "POST",
+            "/orders",
+            {
+                "serveur_id": serveur_id,
+                "lines": [[line.product_id, line.qty] for line in cart],
+            },
+            retry=False,
+        )
+        order = order_from_json(data)
+        order["cafe_name"] = self._get_catalog()["cafe_name"]
+        return order
+
+
+_store: Optional[Any] = None
+
+
+def get_store() -> Any:
+    """LocalStore ou RemoteStore selon CAFE_SERVER (choisi au premier appel)."""
+    global _store
+    if _store is None:
+        url = os.environ.get(SERVER_ENV, "")
+        token = os.environ.get(TOKEN_ENV) or None
+        if url == "local":
+            from order_server import start_in_thread
+
+            server = start_in_thread("127.0.0.1", 0, token)
+            url = f"http://127.0.0.1:{server.port}"
+        if url:
+            _store = RemoteStore(url, token=token)
+        else:
+            journal: Optional[OrderJournal] = OrderJournal(journal_path(database.DB_NAME))
+            try:
+                journal.start()  # type: ignore[union-attr]
+            except JournalBusy:
+                # Une autre instance de la caisse tient le journal : celle-ci
+                # écrit directement dans la base.
+                journal = None
+            except (OSError, sqlite3.Error) as e:
+                raise StoreError(f"Impossible d'ouvrir le journal des commandes : {e}") from None
+            _store = LocalStore(journal)
+    return _store
+
+
+def close_store() -> None:
+    """Ferme le store s'il a été ouvert (fin du programme)."""
+    if _store is not None:
+        _store.close()
@@ -8,14 +8,11 @@ from PyQt5.QtWidgets import (
     QMessageBox,
 )
 
+import instrumentation
 from utils.auth import is_admin
-from ui.servers_window import ServersWindow
-from ui.menu_window import MenuWindow
-from ui.pos_window import POSWindow
-from ui.reports_window import ReportsWindow
-from ui.settings_window import SettingsWindow
 
 
+# Chaque fenêtre n'est importée qu'à sa première ouverture (voir open_*).
 class AdminDashboardWindow(QWidget):
     def __init__(self, user: Dict[str, Any]) -> None:
         super().__init__()
@@ -44,14 +41,19 @@ class AdminDashboardWindow(QWidget):
         self.pos_button = QPushButton("Ouvrir la caisse")
         self.reports_button = QPushButton("Rapports")
         self.settings_button = QPushButton("Paramètres")
-
-        for btn in (
+        buttons = [
             self.servers_button,
             self.menu_button,
             self.pos_button,
             self.reports_button,
             self.settings_button,
-        ):
+        ]
+        # Visible seulement quand l'application est lancée avec CAFE_INSTRUMENT=1.
+        self.diagnostics_button = QPushButton("Diagnostics")
+        if instrumentation.is_installed():
+            buttons.append(self.diagnostics_button)
+
+        for btn in buttons:
             btn.setMinimumHeight(45)
             btn.setStyleSheet("font-size: 14px;")
             layout.addWidget(btn)
@@ -61,25 +63,42 @@ class AdminDashboardWindow(QWidget):
         self.pos_button.clicked.connect(self.open_pos)
         self.reports_button.clicked.connect(self.open_reports)
         self.settings_button.clicked.connect(self.open_settings)
+        self.diagnostics_button.clicked.connect(self.open_diagnostics)
 
         self.setLayout(layout)
 
     def open_servers(self) -> None:
+        from ui.servers_window import ServersWindow
+
         self.servers_window = ServersWindow(self)
         self.servers_window.show()
 
     def open_menu(self) -> None:
+        from ui.menu_window import MenuWindow
+
         self.menu_window = MenuWindow(self)
         self.menu_window.show()
 
     def open_pos(self) -> None:
+        from ui.pos_window import POSWindow
+
         self.pos_window = POSWindow(self.user, parent=self)
         self.pos_window.show()
 
     def open_reports(self) -> None:
+        from ui.reports_window import ReportsWindow
+
         self.reports_window = ReportsWindow(self)
         self.reports_window.show()
 
     def open_settings(self) -> None:
+        from ui.settings_window import SettingsWindow
+
         self.settings_window = SettingsWindow(self)
         self.settings_window.show()
+
+    def open_diagnostics(self) -> None:
+        from ui.diagnostics_window import DiagnosticsWindow
+
+        self.diagnostics_window = DiagnosticsWindow(self)
+        self.diagnostics_window.show()
@@ -0,0 +1,94 @@
+from typing import Optional
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QFileDialog,
+    QMessageBox,
+)
+
+import instrumentation
+
+REFRESH_MS = 2000
+
+COLUMNS = (
+    ("Fonction", "name"),
+    ("Appels", "calls"),
+    ("Total ms", "total_ms"),
+    ("Moy. ms", "mean_ms"),
+    ("p50 ms", "p50_ms"),
+    ("p95 ms", "p95_ms"),
+    ("p99 ms", "p99_ms"),
+    ("Max ms", "max_ms"),
+    ("Requêtes", "queries"),
+    ("Lignes", "rows"),
+)
+
+
+class DiagnosticsWindow(QWidget):
+    """Temps passé dans la base et l'impression, mesuré par instrumentation.py."""
+
+    def __init__(self, parent: Optional[QWidget] = None) -> None:  # type: ignore[name-defined]
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 450)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Durées par fonction depuis le démarrage (ou la remise à zéro)"))
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.refresh_button = QPushButton("Actualiser")
+        self.refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(self.refresh_button)
+        self.reset_button = QPushButton("Remettre à zéro")
+        self.reset_button.clicked.connect(self.on_reset)
+        buttons.addWidget(self.reset_button)
+        self.dump_button = QPushButton("Enregistrer…")
+        self.dump_button.clicked.connect(self.on_dump)
+        buttons.addWidget(self.dump_button)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+        self.refresh()
+
+    def refresh(self) -> None:
+        stats = instrumentation.snapshot()
+        self.table.setRowCount(len(stats))
+        for row, stat in enumerate(stats):
+            for col, (_, key) in enumerate(COLUMNS):
+                value = stat[key]
+                text = f"{value:.3f}" if isinstance(value, float) else str(value)
+                self.table.setItem(row, col, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+
+    def on_reset(self) -> None:
+        instrumentation.reset()
+        self.refresh()
+
+    def on_dump(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Enregistrer les mesures", "diagnostics.json", "JSON (*.json)",
+        )
+        if not path:
+            return
+        try:
+            instrumentation.dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Erreur", f"Enregistrement impossible : {e}")
+            return
+        QMessageBox.information(self, "Succès", f"Mesures enregistrées dans {path}")
@@ -7,10 +7,8 @@ from PyQt5.QtWidgets import (
     QMessageBox,
 )
 
-from models import authenticate_user
+from store import StoreError, get_store
 from utils.auth import is_admin
-from ui.admin_dashboard import AdminDashboardWindow
-from ui.pos_window import POSWindow
 
 
 class LoginWindow(QWidget):
@@ -48,14 +46,23 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Erreur", "Veuillez remplir tous les champs.")
             return
 
-        user = authenticate_user(username, password)
+        try:
+            user = get_store().authenticate_user(username, password)
+        except StoreError as e:
+            QMessageBox.warning(self, "Erreur", str(e))
+            return
         if not user:
             QMessageBox.warning(self, "Erreur", "Identifiants incorrects.")
             return
 
+        # Importées ici pour que l'écran de connexion s'affiche au plus vite.
         if is_admin(user):
+            from ui.admin_dashboard import AdminDashboardWindow
+
             self.next_window = AdminDashboardWindow(user)
         else:
+            from ui.pos_window import POSWindow
+
             self.next_window = POSWindow(user)
 
         self.next_window.show()
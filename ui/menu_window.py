@@ -14,6 +14,7 @@ from PyQt5.QtWidgets import (
     QInputDialog,
 )
 
+from money import Money
 from models import (
     get_categories,
     create_category,
@@ -238,7 +239,7 @@ class MenuWindow(QWidget):
         if not ok:
             return
         try:
-            price = float(price_text.replace(",", "."))
+            price = Money.parse(price_text)
         except ValueError:
             QMessageBox.warning(self, "Erreur", "Prix invalide.")
             return
@@ -278,7 +279,7 @@ class MenuWindow(QWidget):
         if not ok:
             return
         try:
-            price = float(price_text.replace(",", "."))
+            price = Money.parse(price_text)
         except ValueError:
             QMessageBox.warning(self, "Erreur", "Prix invalide.")
             return
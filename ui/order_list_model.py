@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, pyqtSignal
+
+
+class OrderListModel(QAbstractListModel):
+    """Liste des commandes d'une période, chargée page par page au défilement.
+
+    La vue appelle canFetchMore/fetchMore quand elle arrive en bas de la
+    liste. Le modèle ne lit pas la base lui-même : il émet more_requested
+    avec le curseur (date, id) de la dernière commande, et la page arrive
+    plus tard, par morceaux, via append_orders puis finish_loading.
+    """
+
+    more_requested = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.orders: List[Dict[str, Any]] = []
+        self.cursor: Optional[Tuple[str, int]] = None
+        self.exhausted = True
+        self.loading = False
+
+    def reset(self, loading: bool = False) -> None:
+        self.beginResetModel()
+        self.orders = []
+        self.cursor = None
+        self.exhausted = not loading
+        self.loading = loading
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.orders)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self.orders):
+            return None
+        order = self.orders[index.row()]
+        if role == Qt.DisplayRole:
+            return (
+                f"{order['date']} - {order['serveur']} - {order['total']} DH "
+                f"(Cmd #{order['id']})"
+            )
+        if role == Qt.UserRole:
+            return order
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self.exhausted and not self.loading
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        self.loading = True
+        self.more_requested.emit(self.cursor)
+
+    def append_orders(self, orders: List[Dict[str, Any]]) -> None:
+        if not orders:
+            return
+        first = len(self.orders)
+        self.beginInsertRows(QModelIndex(), first, first + len(orders) - 1)
+        self.orders.extend(orders)
+        self.endInsertRows()
+        self.cursor = (orders[-1]["date"], orders[-1]["id"])
+
+    def finish_loading(self, exhausted: bool) -> None:
+        self.loading = False
+        self.exhausted = exhausted
+
+    def order_at(self, row: int) -> Optional[Dict[str, Any]]:
+        if 0 <= row < len(self.orders):
+            return self.orders[row]
+        return None
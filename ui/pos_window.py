@@ -1,19 +1,24 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QWidget,
     QHBoxLayout,
     QVBoxLayout,
     QGroupBox,
     QPushButton,
+    QInputDialog,
     QListWidget,
     QListWidgetItem,
     QLabel,
     QMessageBox,
 )
 
-from models import get_categories, get_products_by_category, create_order
-from utils.tickets import generate_and_print_ticket
+from cart import Cart
+from money import Money
+from store import StoreError, get_store
+from utils.print_queue import get_print_queue
+from utils.tickets import render_ticket, show_manual_print_notice
 
 
 class POSWindow(QWidget):
@@ -26,15 +31,28 @@ class POSWindow(QWidget):
         self.setWindowTitle(f"Caisse - {self.serveur_name}")
         self.resize(1000, 600)
 
-        self.cart: Dict[int, Dict[str, Any]] = {}
-        self.total = 0.0
+        # Base locale ou serveur de commandes partagé (voir store.py)
+        self.store = get_store()
+        try:
+            self.store.refresh()
+            self.categories = self.store.get_categories()
+        except StoreError as e:
+            QMessageBox.warning(self, "Erreur", f"Catalogue indisponible : {e}")
+            self.categories = []
+
+        self.cart = Cart()
+        self.cart_rows: Dict[int, Tuple[QListWidgetItem, QLabel]] = {}
+        # Tables en attente du serveur, par id de held_orders : changer de table
+        # échange simplement self.cart avec le panier gardé ici.
+        self.tabs: Dict[int, Dict[str, Any]] = {}
+        self.tab_items: Dict[int, QListWidgetItem] = {}
+        self.current_tab: Optional[int] = None
 
         main_layout = QHBoxLayout()
 
         cat_group = QGroupBox("Catégories")
         cat_layout = QVBoxLayout()
         self.category_buttons = []
-        self.categories = get_categories()
         for c in self.categories:
             btn = QPushButton(c["name"])
             btn.setFixedHeight(40)
@@ -54,10 +72,22 @@ class POSWindow(QWidget):
         right_group = QGroupBox("Commande")
         right_layout = QVBoxLayout()
 
+        server_layout = QHBoxLayout()
         self.server_label = QLabel(f"Serveur connecté : {self.serveur_name}")
-        right_layout.addWidget(self.server_label)
+        server_layout.addWidget(self.server_label)
+        self.switch_button = QPushButton("Changer de serveur")
+        self.switch_button.clicked.connect(self.switch_server)
+        server_layout.addWidget(self.switch_button)
+        right_layout.addLayout(server_layout)
+
+        right_layout.addWidget(QLabel("Tables en attente :"))
+        self.tabs_list = QListWidget()
+        self.tabs_list.setMaximumHeight(110)
+        self.tabs_list.itemClicked.connect(self.resume_tab)
+        right_layout.addWidget(self.tabs_list)
 
-        right_layout.addWidget(QLabel("Commande en cours :"))
+        self.order_label = QLabel("Commande en cours :")
+        right_layout.addWidget(self.order_label)
         self.cart_list = QListWidget()
         right_layout.addWidget(self.cart_list)
 
@@ -65,6 +95,14 @@ class POSWindow(QWidget):
         self.total_label = QLabel("Total : 0.00 DH")
         bottom_layout.addWidget(self.total_label)
 
+        self.undo_button = QPushButton("Retour")
+        self.undo_button.clicked.connect(self.undo_last)
+        bottom_layout.addWidget(self.undo_button)
+
+        self.hold_button = QPushButton("Mettre en attente")
+        self.hold_button.clicked.connect(self.hold_order)
+        bottom_layout.addWidget(self.hold_button)
+
         self.pay_button = QPushButton("Paiement")
         self.pay_button.clicked.connect(self.handle_payment)
         bottom_layout.addWidget(self.pay_button)
@@ -75,8 +113,14 @@ class POSWindow(QWidget):
 
         self.setLayout(main_layout)
 
+        self.print_queue = get_print_queue()
+        self.pending_tickets = set()
+        self.print_queue.job_printed.connect(self.on_ticket_printed)
+        self.print_queue.job_failed.connect(self.on_ticket_failed)
+
         if self.categories:
             self.load_products(self.categories[0]["id"])
+        self.load_tabs()
 
     def clear_products_layout(self) -> None:
         for i in reversed(range(self.products_layout.count())):
@@ -87,7 +131,7 @@ class POSWindow(QWidget):
 
     def load_products(self, category_id: int) -> None:
         self.clear_products_layout()
-        products = get_products_by_category(category_id)
+        products = self.store.get_products_by_category(category_id)
         if not products:
             self.products_layout.addWidget(
                 QLabel("Aucun produit dans cette catégorie."),
@@ -105,62 +149,282 @@ class POSWindow(QWidget):
             )
             self.products_layout.addWidget(btn)
 
-    def add_to_cart(self, product_id: int, name: str, price: float) -> None:
-        if product_id in self.cart:
-            self.cart[product_id]["qty"] += 1
-        else:
-            self.cart[product_id] = {
-                "name": name,
-                "price": price,
-                "qty": 1,
-            }
-        self.refresh_cart()
+    def add_to_cart(self, product_id: int, name: str, price: Money) -> None:
+        self.cart.add(product_id, name, price)
+        self.sync_cart_row(product_id)
 
     def remove_from_cart(self, product_id: int) -> None:
-        if product_id in self.cart:
-            del self.cart[product_id]
-            self.refresh_cart()
+        if self.cart.remove(product_id) is not None:
+            self.sync_cart_row(product_id)
 
-    def refresh_cart(self) -> None:
-        self.cart_list.clear()
-        self.total = 0.0
-        for prod_id, item in self.cart.items():
-            line_total = item["price"] * item["qty"]
-            self.total += line_total
-
-            list_item = QListWidgetItem()
-            row_widget = QWidget()
-            row_layout = QVBoxLayout()
-            row_layout.setContentsMargins(0, 0, 0, 0)
-
-            label = QLabel(
-                f"{item['name']} x{item['qty']} - {line_total:.2f} DH",
-            )
-            cancel_button = QPushButton("Annuler")
-            cancel_button.setFixedWidth(80)
-            cancel_button.clicked.connect(
-                lambda checked, pid=prod_id: self.remove_from_cart(pid)
-            )
+    def undo_last(self) -> None:
+        product_id = self.cart.undo()
+        if product_id is not None:
+            self.sync_cart_row(product_id)
+
+    def sync_cart_row(self, product_id: int) -> None:
+        """Met à jour la seule ligne affichée du produit, puis le total."""
+        line = self.cart.get(product_id)
+        row = self.cart_rows.get(product_id)
+        if line is None:
+            if row is not None:
+                del self.cart_rows[product_id]
+                self.cart_list.takeItem(self.cart_list.row(row[0]))
+        else:
+            if row is None:
+                self.add_cart_row(product_id)
+            self.update_cart_row(product_id)
+        self.update_total()
 
-            row_layout.addWidget(label)
-            row_layout.addWidget(cancel_button)
-            row_widget.setLayout(row_layout)
+    def add_cart_row(self, product_id: int) -> None:
+        list_item = QListWidgetItem()
+        row_widget = QWidget()
+        row_layout = QVBoxLayout()
+        row_layout.setContentsMargins(0, 0, 0, 0)
 
-            self.cart_list.addItem(list_item)
-            self.cart_list.setItemWidget(list_item, row_widget)
+        label = QLabel()
+        cancel_button = QPushButton("Annuler")
+        cancel_button.setFixedWidth(80)
+        cancel_button.clicked.connect(
+            lambda checked, pid=product_id: self.remove_from_cart(pid)
+        )
+
+        row_layout.addWidget(label)
+        row_layout.addWidget(cancel_button)
+        row_widget.setLayout(row_layout)
+
+        self.cart_list.addItem(list_item)
+        self.cart_list.setItemWidget(list_item, row_widget)
+        list_item.setSizeHint(row_widget.sizeHint())
+        self.cart_rows[product_id] = (list_item, label)
+
+    def update_cart_row(self, product_id: int) -> None:
+        line = self.cart.get(product_id)
+        _, label = self.cart_rows[product_id]
+        label.setText(f"{line.name} x{line.qty} - {line.total} DH")
 
-        self.total_label.setText(f"Total : {self.total:.2f} DH")
+    def update_total(self) -> None:
+        self.total_label.setText(f"Total : {self.cart.total} DH")
+        if self.current_tab is not None:
+            self.update_tab_item(self.current_tab)
+
+    def refresh_cart(self) -> None:
+        """Reconstruit entièrement la liste (changement complet de panier)."""
+        self.cart_list.clear()
+        self.cart_rows = {}
+        for line in self.cart:
+            self.add_cart_row(line.product_id)
+            self.update_cart_row(line.product_id)
+        self.update_total()
 
     def handle_payment(self) -> None:
         if not self.cart:
             QMessageBox.warning(self, "Erreur", "La commande est vide.")
             return
-        order_id = create_order(self.serveur_id, self.cart)
-        generate_and_print_ticket(order_id, parent=self)
+        try:
+            order = self.store.create_order(self.serveur_id, self.cart)
+        except StoreError as e:
+            QMessageBox.warning(
+                self,
+                "Erreur",
+                f"Commande non enregistrée : {e}\nVeuillez réessayer.",
+            )
+            return
+        order["serveur"] = self.serveur_name
+        self.pending_tickets.add(order["id"])
+        self.print_queue.submit(order["id"], render_ticket(order))
+        if self.current_tab is not None:
+            tab = self.tabs.pop(self.current_tab)
+            try:
+                self.store.delete_held_order(tab["id"])
+            except StoreError as e:
+                QMessageBox.warning(
+                    self,
+                    "Erreur",
+                    f"La table « {tab['label']} » est encaissée mais reste "
+                    f"enregistrée en attente : {e}",
+                )
+        self.show_cart(None, Cart())
         QMessageBox.information(
             self,
             "Succès",
-            "Paiement effectué et ticket généré.",
+            "Paiement effectué, ticket en cours d'impression.",
         )
-        self.cart = {}
+
+    def product_name(self, product_id: int) -> str:
+        product = self.store.get_product(product_id)
+        return product["name"] if product else f"Produit {product_id} (retiré du menu)"
+
+    def load_tabs(self) -> None:
+        """Lit les tables en attente du serveur (ouverture, changement de serveur)."""
+        try:
+            held = self.store.get_held_orders(self.serveur_id)
+        except StoreError as e:
+            QMessageBox.warning(self, "Erreur", f"Tables en attente indisponibles : {e}")
+            held = []
+        self.tabs = {
+            h["id"]: {
+                "id": h["id"],
+                "label": h["label"],
+                "cart": Cart.unpack(h["lines"], self.product_name),
+                "saved": h["lines"],
+            }
+            for h in held
+        }
+        self.refresh_tabs()
+
+    def refresh_tabs(self) -> None:
+        self.tabs_list.clear()
+        self.tab_items = {}
+        for held_id in self.tabs:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, held_id)
+            self.tabs_list.addItem(item)
+            self.tab_items[held_id] = item
+            self.update_tab_item(held_id)
+        current = self.tab_items.get(self.current_tab)  # type: ignore[arg-type]
+        if current is not None:
+            self.tabs_list.setCurrentItem(current)
+        else:
+            self.tabs_list.clearSelection()
+        label = self.tabs[self.current_tab]["label"] if current is not None else ""
+        self.order_label.setText(
+            f"Commande en cours : {label}" if label else "Commande en cours :"
+        )
+
+    def update_tab_item(self, held_id: int) -> None:
+        item = self.tab_items.get(held_id)
+        if item is not None:
+            tab = self.tabs[held_id]
+            item.setText(f"{tab['label']} - {tab['cart'].total} DH")
+
+    def show_cart(self, held_id: Optional[int], cart: Cart) -> None:
+        """Affiche `cart` (table `held_id`, ou nouvelle commande si None)."""
+        self.current_tab = held_id
+        self.cart = cart
         self.refresh_cart()
+        self.refresh_tabs()
+
+    def save_current_tab(self) -> bool:
+        """Enregistre la table affichée si son panier a changé, ou la ferme si elle est vide."""
+        if self.current_tab is None:
+            return True
+        tab = self.tabs[self.current_tab]
+        if not self.cart:
+            # Table vidée : elle est fermée plutôt que gardée à 0.00 DH.
+            try:
+                self.store.delete_held_order(tab["id"])
+            except StoreError as e:
+                QMessageBox.warning(self, "Erreur", f"Table non supprimée : {e}")
+                return False
+            del self.tabs[self.current_tab]
+            self.current_tab = None
+            return True
+        lines = self.cart.pack()
+        if lines == tab["saved"]:
+            return True
+        try:
+            self.store.save_held_order(self.serveur_id, tab["label"], lines, tab["id"])
+        except StoreError as e:
+            QMessageBox.warning(self, "Erreur", f"Table non enregistrée : {e}")
+            return False
+        tab["saved"] = lines
+        return True
+
+    def hold_order(self) -> None:
+        """Met la commande en attente (nouvelle table) et repart d'un panier vide."""
+        if self.current_tab is None:
+            if not self.cart:
+                QMessageBox.warning(self, "Erreur", "La commande est vide.")
+                return
+            label, ok = QInputDialog.getText(
+                self,
+                "Mettre en attente",
+                "Nom de la table :",
+                text=f"Table {len(self.tabs) + 1}",
+            )
+            label = label.strip()
+            if not ok or not label:
+                return
+            lines = self.cart.pack()
+            try:
+                held_id = self.store.save_held_order(self.serveur_id, label, lines)
+            except StoreError as e:
+                QMessageBox.warning(self, "Erreur", f"Table non enregistrée : {e}")
+                return
+            self.tabs[held_id] = {
+                "id": held_id,
+                "label": label,
+                "cart": self.cart,
+                "saved": lines,
+            }
+        elif not self.save_current_tab():
+            return
+        self.show_cart(None, Cart())
+
+    def resume_tab(self, item: QListWidgetItem) -> None:  # type: ignore[valid-type]
+        held_id = item.data(Qt.UserRole)
+        if held_id == self.current_tab:
+            return
+        if self.current_tab is None and self.cart:
+            QMessageBox.warning(
+                self,
+                "Erreur",
+                "Mettez d'abord la commande en cours en attente, ou encaissez-la.",
+            )
+            self.refresh_tabs()
+            return
+        if not self.save_current_tab():
+            self.refresh_tabs()
+            return
+        self.show_cart(held_id, self.tabs[held_id]["cart"])
+
+    def closeEvent(self, event: Any) -> None:
+        # Table non enregistrée : la fenêtre reste ouverte pour ne pas la perdre.
+        if not self.save_current_tab():
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+    def switch_server(self) -> None:
+        """Passe la caisse à un autre serveur (code PIN), sans recharger la fenêtre."""
+        if not self.store.get_pin_users():
+            QMessageBox.information(
+                self,
+                "Changer de serveur",
+                "Aucun serveur n'a de code PIN. L'administrateur peut en définir "
+                "dans « Gérer les serveurs ».",
+            )
+            return
+        from ui.switch_server_dialog import SwitchServerDialog
+
+        dialog = SwitchServerDialog(self.store, self.serveur_id, self)
+        if dialog.exec_() and dialog.user is not None:
+            self.set_server(dialog.user)
+
+    def set_server(self, user: Dict[str, Any]) -> None:
+        """Les commandes suivantes sont au nom de `user`.
+
+        Une commande pas encore mise en attente est conservée ; les tables
+        affichées deviennent celles du nouveau serveur.
+        """
+        if self.current_tab is not None:
+            if not self.save_current_tab():
+                return
+            self.current_tab = None
+            self.cart = Cart()
+            self.refresh_cart()
+        self.user = user
+        self.serveur_id = user["id"]
+        self.serveur_name = user["username"]
+        self.setWindowTitle(f"Caisse - {self.serveur_name}")
+        self.server_label.setText(f"Serveur connecté : {self.serveur_name}")
+        self.load_tabs()
+
+    def on_ticket_printed(self, order_id: int) -> None:
+        self.pending_tickets.discard(order_id)
+
+    def on_ticket_failed(self, order_id: int, ticket_name: str) -> None:
+        if order_id in self.pending_tickets:
+            self.pending_tickets.discard(order_id)
+            show_manual_print_notice(self, ticket_name)
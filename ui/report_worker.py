@@ -0,0 +1,144 @@
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from database import open_readonly_conn, using_conn
+from export import export_sales
+from models import (
+    get_order_items_many,
+    get_sales_by_category,
+    get_sales_by_server,
+    get_sales_summary,
+    iter_orders,
+)
+
+
+class ReportSignals(QObject):
+    """Résultats des tâches de rapport ; chaque signal porte le numéro de la
+    requête (generation) pour que la fenêtre ignore les réponses périmées."""
+
+    summary = pyqtSignal(int, dict)
+    # (generation, commandes, détails des commandes par id)
+    orders = pyqtSignal(int, list, dict)
+    # (generation, page terminée, plus de commandes à lire)
+    finished = pyqtSignal(int, bool)
+    failed = pyqtSignal(int, str)
+
+
+class ReportTask(QRunnable):
+    """Exécute une requête de rapport sur sa propre connexion en lecture seule.
+
+    Les commandes sont envoyées par morceaux au fur et à mesure de la lecture.
+    cancel() interrompt la requête SQLite en cours (progress handler +
+    interrupt) ; la tâche se termine alors sans rien émettre.
+    """
+
+    def __init__(
+        self,
+        signals: ReportSignals,
+        generation: int,
+        start: str,
+        end: str,
+        after: Optional[Tuple[str, int]] = None,
+        page_size: int = 200,
+        chunk_size: int = 50,
+        with_summary: bool = False,
+    ) -> None:
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.start = start
+        self.end = end
+        self.after = after
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.with_summary = with_summary
+        self._cancelled = threading.Event()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+
+    def run(self) -> None:
+        if self._cancelled.is_set():
+            return
+        try:
+            conn = open_readonly_conn()
+        except sqlite3.Error as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        conn.set_progress_handler(lambda: int(self._cancelled.is_set()), 1000)
+        self._conn = conn
+        try:
+            with using_conn(conn):
+                self._run_queries()
+        except sqlite3.OperationalError as e:
+            if not self._cancelled.is_set():
+                self.signals.failed.emit(self.generation, str(e))
+        finally:
+            self._conn = None
+            conn.close()
+
+    def _run_queries(self) -> None:
+        if self.with_summary:
+            summary = get_sales_summary(self.start, self.end)
+            summary["by_server"] = get_sales_by_server(self.start, self.end)
+            summary["by_category"] = get_sales_by_category(self.start, self.end)
+            if self._cancelled.is_set():
+                return
+            self.signals.summary.emit(self.generation, summary)
+
+        count = 0
+        for chunk in iter_orders(
+            self.start, self.end, self.after, self.page_size, self.chunk_size,
+        ):
+            items = get_order_items_many([o["id"] for o in chunk])
+            if self._cancelled.is_set():
+                return
+            self.signals.orders.emit(self.generation, chunk, items)
+            count += len(chunk)
+        if not self._cancelled.is_set():
+            self.signals.finished.emit(self.generation, count < self.page_size)
+
+
+class ExportSignals(QObject):
+    # (fichier, nombre de lignes)
+    finished = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+
+class ExportTask(QRunnable):
+    """Export des ventes d'une période vers un fichier, hors du thread de l'interface."""
+
+    def __init__(
+        self,
+        signals: ExportSignals,
+        path: str,
+        start: str,
+        end: str,
+        fmt: str = "csv",
+    ) -> None:
+        super().__init__()
+        self.signals = signals
+        self.path = path
+        self.start = start
+        self.end = end
+        self.fmt = fmt
+
+    def run(self) -> None:
+        try:
+            conn = open_readonly_conn()
+            try:
+                with using_conn(conn):
+                    count = export_sales(self.path, self.start, self.end, self.fmt)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError, RuntimeError) as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.path, count)
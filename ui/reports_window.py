@@ -1,20 +1,27 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import QDate, QModelIndex, QThreadPool
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
     QGroupBox,
     QLabel,
+    QListView,
     QListWidget,
-    QListWidgetItem,
+    QProgressBar,
     QPushButton,
     QMessageBox,
     QDateEdit,
+    QFileDialog,
 )
 
-from models import get_orders_between_dates, get_order_items
+from models import get_order_items_many
+from ui.order_list_model import OrderListModel
+from ui.report_worker import ExportSignals, ExportTask, ReportSignals, ReportTask
+from utils.cache import LRUCache
+
+PAGE_SIZE = 200
 
 
 class ReportsWindow(QWidget):
@@ -23,6 +30,24 @@ class ReportsWindow(QWidget):
         self.setWindowTitle("Rapports des ventes")
         self.resize(800, 500)
 
+        # Les requêtes tournent hors du thread de l'interface ; chaque
+        # demande reçoit un numéro et les réponses d'une ancienne demande
+        # sont ignorées.
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = ReportSignals(self)
+        self.signals.summary.connect(self.on_summary)
+        self.signals.orders.connect(self.on_orders)
+        self.signals.finished.connect(self.on_page_finished)
+        self.signals.failed.connect(self.on_report_failed)
+        self.generation = 0
+        self.task: Optional[ReportTask] = None
+        self.range: Optional[Tuple[str, str]] = None
+        self.expected_orders = 0
+        self.export_signals = ExportSignals(self)
+        self.export_signals.finished.connect(self.on_export_finished)
+        self.export_signals.failed.connect(self.on_export_failed)
+
         main_layout = QVBoxLayout()
 
         filter_layout = QHBoxLayout()
@@ -30,26 +55,43 @@ class ReportsWindow(QWidget):
         self.start_date = QDateEdit()
         self.start_date.setCalendarPopup(True)
         self.start_date.setDate(QDate.currentDate())
+        self.start_date.dateChanged.connect(self.cancel_report)
         filter_layout.addWidget(self.start_date)
 
         filter_layout.addWidget(QLabel("Date fin :"))
         self.end_date = QDateEdit()
         self.end_date.setCalendarPopup(True)
         self.end_date.setDate(QDate.currentDate())
+        self.end_date.dateChanged.connect(self.cancel_report)
         filter_layout.addWidget(self.end_date)
 
         self.filter_button = QPushButton("Afficher")
         self.filter_button.clicked.connect(self.load_orders)
         filter_layout.addWidget(self.filter_button)
 
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_report)
+        filter_layout.addWidget(self.cancel_button)
+
+        self.export_button = QPushButton("Exporter")
+        self.export_button.clicked.connect(self.export_sales)
+        filter_layout.addWidget(self.export_button)
+
         main_layout.addLayout(filter_layout)
 
         center_layout = QHBoxLayout()
 
         orders_group = QGroupBox("Commandes")
         orders_layout = QVBoxLayout()
-        self.orders_list = QListWidget()
-        self.orders_list.currentItemChanged.connect(self.on_order_selected)
+        self.orders_model = OrderListModel(parent=self)
+        self.orders_model.more_requested.connect(self.load_more_orders)
+        # Détails des commandes déjà chargés (une commande ne change plus)
+        self.items_cache: LRUCache[List[Dict[str, Any]]] = LRUCache(maxsize=1024)
+        self.orders_list = QListView()
+        self.orders_list.setUniformItemSizes(True)
+        self.orders_list.setModel(self.orders_model)
+        self.orders_list.selectionModel().currentChanged.connect(self.on_order_selected)
         orders_layout.addWidget(self.orders_list)
         orders_group.setLayout(orders_layout)
         center_layout.addWidget(orders_group, 2)
@@ -61,20 +103,73 @@ class ReportsWindow(QWidget):
         items_group.setLayout(items_layout)
         center_layout.addWidget(items_group, 3)
 
+        summary_group = QGroupBox("Résumé de la période")
+        summary_layout = QVBoxLayout()
+        self.summary_list = QListWidget()
+        summary_layout.addWidget(self.summary_list)
+        summary_group.setLayout(summary_layout)
+        center_layout.addWidget(summary_group, 2)
+
         main_layout.addLayout(center_layout)
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        main_layout.addWidget(self.progress_bar)
+
         self.total_label = QLabel("Total pour la période : 0.00 DH")
         main_layout.addWidget(self.total_label)
 
         self.setLayout(main_layout)
 
+    def start_task(self, after: Optional[Tuple[str, int]], with_summary: bool) -> None:
+        start, end = self.range  # type: ignore[misc]
+        self.task = ReportTask(
+            self.signals,
+            self.generation,
+            start,
+            end,
+            after=after,
+            page_size=PAGE_SIZE,
+            with_summary=with_summary,
+        )
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setVisible(True)
+        self.pool.start(self.task)
+
+    def cancel_report(self) -> None:
+        """Abandonne la requête en cours (nouveau filtre ou bouton Annuler)."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.generation += 1
+        self.orders_model.finish_loading(exhausted=True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setVisible(False)
+
     def load_orders(self) -> None:
-        self.orders_list.clear()
+        self.cancel_report()
         self.items_list.clear()
+        self.summary_list.clear()
+        self.total_label.setText("Chargement…")
         start = self.start_date.date().toString("yyyy-MM-dd")
         end = self.end_date.date().toString("yyyy-MM-dd")
-        orders = get_orders_between_dates(start, end)
-        if not orders:
+        self.range = (start, end)
+        self.expected_orders = 0
+        self.progress_bar.setRange(0, 0)
+        self.orders_model.reset(loading=True)
+        self.start_task(after=None, with_summary=True)
+
+    def load_more_orders(self, after: Optional[Tuple[str, int]]) -> None:
+        if self.range is None:
+            return
+        self.start_task(after=after, with_summary=False)
+
+    def on_summary(self, generation: int, summary: Dict[str, Any]) -> None:
+        if generation != self.generation:
+            return
+        self.expected_orders = summary["orders_count"]
+        if not self.expected_orders:
+            self.cancel_report()
             QMessageBox.information(
                 self,
                 "Information",
@@ -82,31 +177,96 @@ class ReportsWindow(QWidget):
             )
             self.total_label.setText("Total pour la période : 0.00 DH")
             return
-        total_period = 0.0
-        for o in orders:
-            total_period += o["total"]
-            text = (
-                f"{o['date']} - {o['serveur']} - {o['total']:.2f} DH "
-                f"(Cmd #{o['id']})"
-            )
-            item = QListWidgetItem(text)
-            item.setData(Qt.UserRole, o)
-            self.orders_list.addItem(item)
+        self.progress_bar.setRange(0, self.expected_orders)
+        self.load_summary(summary)
         self.total_label.setText(
-            f"Total pour la période : {total_period:.2f} DH",
+            f"Total pour la période : {summary['total']} DH "
+            f"({summary['orders_count']} commandes)",
         )
 
-    def on_order_selected(
+    def on_orders(
         self,
-        current: Optional[QListWidgetItem],  # type: ignore[valid-type]
-        previous: Optional[QListWidgetItem],  # type: ignore[valid-type]
+        generation: int,
+        orders: List[Dict[str, Any]],
+        items: Dict[int, List[Dict[str, Any]]],
     ) -> None:
+        if generation != self.generation:
+            return
+        for order_id, order_items in items.items():
+            self.items_cache.put(order_id, order_items)
+        self.orders_model.append_orders(orders)
+        self.progress_bar.setValue(min(len(self.orders_model.orders), self.expected_orders))
+
+    def on_page_finished(self, generation: int, exhausted: bool) -> None:
+        if generation != self.generation:
+            return
+        self.task = None
+        self.orders_model.finish_loading(exhausted)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setVisible(False)
+
+    def on_report_failed(self, generation: int, message: str) -> None:
+        if generation != self.generation:
+            return
+        self.cancel_report()
+        QMessageBox.warning(self, "Erreur", f"Rapport impossible : {message}")
+
+    def load_summary(self, summary: Dict[str, Any]) -> None:
+        self.summary_list.addItem("Par serveur :")
+        for s in summary["by_server"]:
+            self.summary_list.addItem(
+                f"  {s['serveur']} - {s['orders_count']} cmd - {s['total']} DH"
+            )
+        self.summary_list.addItem("Par catégorie :")
+        for c in summary["by_category"]:
+            self.summary_list.addItem(
+                f"  {c['name']} - x{c['qty']} - {c['total']} DH"
+            )
+
+    def on_order_selected(self, current: QModelIndex, previous: QModelIndex) -> None:
         self.items_list.clear()
-        if not current:
+        order = self.orders_model.order_at(current.row())
+        if not order:
             return
-        order = current.data(Qt.UserRole)
         order_id = order["id"]
-        items = get_order_items(order_id)
+        items = self.items_cache.get(order_id)
+        if items is None:
+            items = get_order_items_many([order_id])[order_id]
+            self.items_cache.put(order_id, items)
         for it in items:
             text = f"{it['name']} x{it['qty']} - {it['total']:.2f} DH"
             self.items_list.addItem(text)
+
+    def export_sales(self) -> None:
+        path, selected = QFileDialog.getSaveFileName(
+            self,
+            "Exporter les ventes",
+            "ventes.csv",
+            "CSV (*.csv);;Parquet (*.parquet)",
+        )
+        if not path:
+            return
+        fmt = "parquet" if selected.startswith("Parquet") else "csv"
+        start = self.start_date.date().toString("yyyy-MM-dd")
+        end = self.end_date.date().toString("yyyy-MM-dd")
+        self.export_button.setEnabled(False)
+        # Pool global : l'export ne bloque pas les requêtes du rapport.
+        QThreadPool.globalInstance().start(
+            ExportTask(self.export_signals, path, start, end, fmt)
+        )
+
+    def on_export_finished(self, path: str, count: int) -> None:
+        self.export_button.setEnabled(True)
+        QMessageBox.information(
+            self,
+            "Export terminé",
+            f"{count} lignes exportées dans {path}",
+        )
+
+    def on_export_failed(self, message: str) -> None:
+        self.export_button.setEnabled(True)
+        QMessageBox.warning(self, "Erreur", f"Export impossible : {message}")
+
+    def closeEvent(self, event: Any) -> None:
+        self.cancel_report()
+        super().closeEvent(event)
@@ -1,3 +1,4 @@
+import sqlite3
 from typing import Any, Dict, Optional
 
 from PyQt5.QtCore import Qt
@@ -14,7 +15,14 @@ from PyQt5.QtWidgets import (
     QMessageBox,
 )
 
-from models import get_all_servers, create_server, update_server, delete_server
+from models import (
+    get_all_servers,
+    create_server,
+    update_server,
+    delete_server,
+    set_user_pin,
+)
+from utils.auth import is_valid_pin
 
 
 class ServersWindow(QWidget):
@@ -48,13 +56,22 @@ class ServersWindow(QWidget):
         self.password_edit.setEchoMode(QLineEdit.Password)
         form_layout.addWidget(self.password_edit)
 
+        form_layout.addWidget(QLabel("Code PIN (changement rapide à la caisse) :"))
+        self.pin_edit = QLineEdit()
+        self.pin_edit.setPlaceholderText("4 à 6 chiffres, facultatif")
+        self.pin_edit.setEchoMode(QLineEdit.Password)
+        self.pin_edit.setMaxLength(6)
+        form_layout.addWidget(self.pin_edit)
+
         buttons_layout = QHBoxLayout()
         self.add_button = QPushButton("Ajouter")
         self.update_button = QPushButton("Modifier")
         self.delete_button = QPushButton("Supprimer")
+        self.remove_pin_button = QPushButton("Retirer le PIN")
         buttons_layout.addWidget(self.add_button)
         buttons_layout.addWidget(self.update_button)
         buttons_layout.addWidget(self.delete_button)
+        buttons_layout.addWidget(self.remove_pin_button)
         form_layout.addLayout(buttons_layout)
 
         form_group.setLayout(form_layout)
@@ -66,6 +83,7 @@ class ServersWindow(QWidget):
         self.add_button.clicked.connect(self.on_add)
         self.update_button.clicked.connect(self.on_update)
         self.delete_button.clicked.connect(self.on_delete)
+        self.remove_pin_button.clicked.connect(self.on_remove_pin)
 
         self.load_servers()
 
@@ -87,11 +105,13 @@ class ServersWindow(QWidget):
             self.selected_user = None
             self.username_edit.clear()
             self.password_edit.clear()
+            self.pin_edit.clear()
             return
         user = current.data(Qt.UserRole)
         self.selected_user = user
         self.username_edit.setText(user["username"])
         self.password_edit.clear()
+        self.pin_edit.clear()
 
     def on_add(self) -> None:
         username = self.username_edit.text().strip()
@@ -103,10 +123,20 @@ class ServersWindow(QWidget):
                 "Veuillez saisir un nom d'utilisateur et un mot de passe.",
             )
             return
-        create_server(username, password, role="serveur")
+        pin = self.pin_edit.text().strip()
+        if pin and not self.check_pin(pin):
+            return
+        try:
+            user_id = create_server(username, password, role="serveur")
+        except sqlite3.IntegrityError:
+            QMessageBox.warning(self, "Erreur", "Ce nom d'utilisateur existe déjà.")
+            return
+        if pin:
+            set_user_pin(user_id, pin)
         QMessageBox.information(self, "Succès", "Serveur ajouté.")
         self.username_edit.clear()
         self.password_edit.clear()
+        self.pin_edit.clear()
         self.load_servers()
 
     def on_update(self) -> None:
@@ -122,10 +152,43 @@ class ServersWindow(QWidget):
                 "Veuillez saisir un nom d'utilisateur et un mot de passe.",
             )
             return
-        update_server(self.selected_user["id"], username, password)
+        pin = self.pin_edit.text().strip()
+        if pin and not self.check_pin(pin):
+            return
+        try:
+            update_server(self.selected_user["id"], username, password)
+        except sqlite3.IntegrityError:
+            QMessageBox.warning(self, "Erreur", "Ce nom d'utilisateur existe déjà.")
+            return
+        # PIN laissé vide : le code actuel est conservé.
+        if pin:
+            set_user_pin(self.selected_user["id"], pin)
+        self.pin_edit.clear()
         QMessageBox.information(self, "Succès", "Serveur modifié.")
         self.load_servers()
 
+    def check_pin(self, pin: str) -> bool:
+        if is_valid_pin(pin):
+            return True
+        QMessageBox.warning(
+            self,
+            "Erreur",
+            "Le code PIN doit comporter de 4 à 6 chiffres.",
+        )
+        return False
+
+    def on_remove_pin(self) -> None:
+        if not self.selected_user:
+            QMessageBox.warning(self, "Erreur", "Veuillez sélectionner un serveur.")
+            return
+        set_user_pin(self.selected_user["id"], None)
+        self.pin_edit.clear()
+        QMessageBox.information(
+            self,
+            "Succès",
+            "Code PIN retiré : ce serveur devra passer par l'écran de connexion.",
+        )
+
     def on_delete(self) -> None:
         if not self.selected_user:
             QMessageBox.warning(self, "Erreur", "Veuillez sélectionner un serveur.")
@@ -146,4 +209,5 @@ class ServersWindow(QWidget):
         self.selected_user = None
         self.username_edit.clear()
         self.password_edit.clear()
+        self.pin_edit.clear()
         self.load_servers()
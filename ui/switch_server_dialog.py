@@ -0,0 +1,91 @@
+from typing import Any, Dict, Optional
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QDialog,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QMessageBox,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from store import StoreError
+
+
+class SwitchServerDialog(QDialog):
+    """Changement rapide de serveur à la caisse : choix du serveur puis code PIN.
+
+    La vérification se fait sur la liste des serveurs gardée en mémoire par le
+    store, sans recharger la fenêtre de caisse ; le serveur choisi est dans
+    `self.user` quand le dialogue est accepté.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        current_id: int,
+        parent: Optional[QWidget] = None,  # type: ignore[name-defined]
+    ) -> None:
+        super().__init__(parent)
+        self.store = store
+        self.user: Optional[Dict[str, Any]] = None
+        self.setWindowTitle("Changer de serveur")
+        self.resize(300, 350)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Serveur :"))
+        self.users_list = QListWidget()
+        for u in store.get_pin_users():
+            if u["id"] == current_id:
+                continue
+            item = QListWidgetItem(u["username"])
+            item.setData(Qt.UserRole, u["id"])
+            self.users_list.addItem(item)
+        layout.addWidget(self.users_list)
+
+        layout.addWidget(QLabel("Code PIN :"))
+        self.pin_edit = QLineEdit()
+        self.pin_edit.setEchoMode(QLineEdit.Password)
+        self.pin_edit.setMaxLength(6)
+        self.pin_edit.returnPressed.connect(self.on_validate)
+        layout.addWidget(self.pin_edit)
+
+        buttons_layout = QHBoxLayout()
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.clicked.connect(self.reject)
+        self.ok_button = QPushButton("Valider")
+        self.ok_button.setDefault(True)
+        self.ok_button.clicked.connect(self.on_validate)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.ok_button)
+        layout.addLayout(buttons_layout)
+
+        self.setLayout(layout)
+
+        self.users_list.itemClicked.connect(lambda item: self.pin_edit.setFocus())
+        if self.users_list.count():
+            self.users_list.setCurrentRow(0)
+        self.pin_edit.setFocus()
+
+    def on_validate(self) -> None:
+        item = self.users_list.currentItem()
+        pin = self.pin_edit.text().strip()
+        if item is None or not pin:
+            QMessageBox.warning(self, "Erreur", "Choisissez un serveur et saisissez son code PIN.")
+            return
+        try:
+            user = self.store.authenticate_pin(item.data(Qt.UserRole), pin)
+        except StoreError as e:
+            QMessageBox.warning(self, "Erreur", str(e))
+            return
+        if user is None:
+            self.pin_edit.clear()
+            QMessageBox.warning(self, "Erreur", "Code PIN incorrect.")
+            return
+        self.user = user
+        self.accept()
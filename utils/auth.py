@@ -1,5 +1,194 @@
-from typing import Any, Dict
+"""Rôles, mots de passe et limitation des tentatives de connexion.
+
+Les mots de passe sont stockés sous la forme
+"pbkdf2_sha256$<itérations>$<sel>$<empreinte>" (sel aléatoire par compte).
+Les codes PIN du changement rapide de serveur utilisent le même format avec
+un coût fixe plus faible (PIN_ITERATIONS). Le coût des mots de passe se
+règle avec CAFE_PASSWORD_ITERATIONS, en s'aidant de `python -m bench.auth`
+sur le matériel de la caisse ; les empreintes d'un autre coût sont
+recalculées à la connexion suivante.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from utils.cache import LRUCache
+
+ALGORITHM = "pbkdf2_sha256"
+ITERATIONS_ENV = "CAFE_PASSWORD_ITERATIONS"
+DEFAULT_ITERATIONS = 200_000
+# Code PIN du changement rapide de serveur : 4 à 6 chiffres. Un coût élevé ne
+# protégerait pas un espace aussi petit (la limite de tentatives s'en charge) ;
+# on garde une dérivation de quelques millisecondes.
+PIN_ITERATIONS = 10_000
+PIN_LENGTHS = range(4, 7)
 
 
 def is_admin(user: Dict[str, Any]) -> bool:
     return user is not None and user.get("role") == "admin"
+
+
+def password_iterations() -> int:
+    try:
+        return max(1, int(os.environ.get(ITERATIONS_ENV, DEFAULT_ITERATIONS)))
+    except ValueError:
+        return DEFAULT_ITERATIONS
+
+
+def _derive(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password: str, iterations: Optional[int] = None) -> str:
+    iterations = iterations or password_iterations()
+    salt = secrets.token_bytes(16)
+    digest = _derive(password, salt, iterations)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def is_valid_pin(pin: str) -> bool:
+    return pin.isdigit() and len(pin) in PIN_LENGTHS
+
+
+def hash_pin(pin: str) -> str:
+    return hash_password(pin, iterations=PIN_ITERATIONS)
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(ALGORITHM + "$")
+
+
+def _parse(stored: str) -> Optional[Tuple[int, bytes, bytes]]:
+    try:
+        algorithm, iterations, salt, digest = stored.split("$")
+        if algorithm != ALGORITHM:
+            return None
+        return int(iterations), bytes.fromhex(salt), bytes.fromhex(digest)
+    except ValueError:
+        return None
+
+
+def needs_rehash(stored: str) -> bool:
+    """Vrai si l'empreinte n'utilise pas le coût actuel (à recalculer après connexion)."""
+    parsed = _parse(stored)
+    return parsed is None or parsed[0] != password_iterations()
+
+
+# Vérifications réussies récentes : une reconnexion au même compte (changement
+# de serveur à la caisse) ne refait pas la dérivation complète. La clé est un
+# HMAC avec une clé propre au processus ; rien de réutilisable n'est conservé.
+_verified: LRUCache[bool] = LRUCache(maxsize=256)
+_verified_key = secrets.token_bytes(32)
+_verified_lock = threading.Lock()
+
+
+def _cache_key(password: str, stored: str) -> bytes:
+    return hmac.new(
+        _verified_key, f"{stored}\0{password}".encode("utf-8"), hashlib.sha256,
+    ).digest()
+
+
+def verify_password(password: str, stored: str) -> bool:
+    parsed = _parse(stored)
+    if parsed is None:
+        return False
+    key = _cache_key(password, stored)
+    with _verified_lock:
+        if _verified.get(key):
+            return True
+    iterations, salt, digest = parsed
+    if not hmac.compare_digest(_derive(password, salt, iterations), digest):
+        return False
+    with _verified_lock:
+        _verified.put(key, True)
+    return True
+
+
+def clear_verified_cache() -> None:
+    with _verified_lock:
+        _verified.clear()
+
+
+# Empreinte vérifiée quand le compte n'existe pas : même durée de réponse.
+_dummy_hash: Optional[str] = None
+
+
+def dummy_verify(password: str) -> None:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(8))
+    verify_password(password, _dummy_hash)
+
+
+class TooManyAttempts(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            f"Trop de tentatives. Réessayez dans {max(1, round(retry_after))} s."
+        )
+        self.retry_after = retry_after
+
+
+class LoginThrottle:
+    """Au plus `max_failures` échecs par identifiant sur `window` secondes (en mémoire).
+
+    Au plus `max_tracked` identifiants sont suivis : au-delà, les entrées
+    expirées puis les plus anciennes sont oubliées (identifiants inventés).
+    """
+
+    def __init__(
+        self,
+        max_failures: int = 5,
+        window: float = 60.0,
+        max_tracked: int = 10_000,
+    ) -> None:
+        self.max_failures = max_failures
+        self.window = window
+        self.max_tracked = max_tracked
+        self._failures: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, username: str, now: float) -> Deque[float]:
+        failures = self._failures.get(username)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[username]
+        return failures
+
+    def check(self, username: str) -> None:
+        """Lève TooManyAttempts si l'identifiant est bloqué."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(username, now)
+            if len(failures) >= self.max_failures:
+                raise TooManyAttempts(failures[0] + self.window - now)
+
+    def failed(self, username: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._recent(username, now)
+            if username not in self._failures and len(self._failures) >= self.max_tracked:
+                self._prune(now)
+            self._failures.setdefault(username, deque()).append(now)
+
+    def _prune(self, now: float) -> None:
+        for name in list(self._failures):
+            self._recent(name, now)
+        # Encore plein : les identifiants suivis depuis le plus longtemps.
+        while len(self._failures) >= self.max_tracked:
+            del self._failures[next(iter(self._failures))]
+
+    def succeeded(self, username: str) -> None:
+        with self._lock:
+            self._failures.pop(username, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures.clear()
@@ -0,0 +1,151 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from database import close_conn
+from utils.tickets import (
+    PrintUnavailable,
+    build_ticket_text,
+    print_ticket,
+    write_ticket,
+)
+
+SPOOL_DIR = "spool"
+
+
+class PrintQueue(QObject):
+    """File d'impression des tickets traitée par un thread de fond.
+
+    Chaque ticket demandé est d'abord écrit dans le dossier de spool, puis
+    imprimé dans l'ordre d'arrivée. Le fichier de spool n'est supprimé qu'une
+    fois le ticket traité : au redémarrage, les tickets en attente sont repris.
+    Les signaux sont émis depuis le thread de fond ; Qt les délivre aux
+    fenêtres dans le thread de l'interface.
+    """
+
+    job_queued = pyqtSignal(int)
+    job_printed = pyqtSignal(int)
+    # (id de commande, fichier du ticket à imprimer manuellement)
+    job_failed = pyqtSignal(int, str)
+
+    def __init__(
+        self,
+        spool_dir: str = SPOOL_DIR,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ) -> None:
+        super().__init__()
+        self.spool_dir = spool_dir
+        self.retries = retries
+        self.retry_delay = retry_delay
+        # (id de commande, texte du ticket, fichier de spool ou None)
+        self._jobs: "queue.Queue[Optional[Tuple[int, Optional[str], Optional[str]]]]" = (
+            queue.Queue()
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            job_path = os.path.join(self.spool_dir, name)
+            try:
+                with open(job_path, encoding="utf-8") as f:
+                    job = json.load(f)
+                order_id = job["order_id"]
+            except (OSError, ValueError, KeyError):
+                self._discard(job_path)
+                continue
+            self._jobs.put((order_id, job.get("text"), job_path))
+        self._thread = threading.Thread(
+            target=self._run, name="print-queue", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, order_id: int, ticket_text: Optional[str] = None) -> None:
+        """Met un ticket en file ; sans texte, il sera relu depuis la base."""
+        job_path: Optional[str] = os.path.join(
+            self.spool_dir, f"{time.time_ns():020d}_{order_id}.json",
+        )
+        try:
+            with open(job_path, "w", encoding="utf-8") as f:  # type: ignore[arg-type]
+                json.dump({"order_id": order_id, "text": ticket_text}, f)
+        except OSError:
+            job_path = None
+        self._jobs.put((order_id, ticket_text, job_path))
+        self.job_queued.emit(order_id)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                self._process(*job)
+        finally:
+            close_conn()
+
+    def _process(
+        self,
+        order_id: int,
+        ticket_text: Optional[str],
+        job_path: Optional[str],
+    ) -> None:
+        ticket_name = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                if ticket_name is None:
+                    if ticket_text is None:
+                        ticket_text = build_ticket_text(order_id)
+                    if ticket_text is None:
+                        break
+                    ticket_name = write_ticket(order_id, ticket_text)
+                print_ticket(ticket_name)
+            except PrintUnavailable:
+                break
+            except Exception:
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * attempt)
+                continue
+            self._discard(job_path)
+            self.job_printed.emit(order_id)
+            return
+
+        self._discard(job_path)
+        if ticket_name is not None:
+            self.job_failed.emit(order_id, ticket_name)
+
+    def _discard(self, job_path: Optional[str]) -> None:
+        if job_path is None:
+            return
+        try:
+            os.remove(job_path)
+        except OSError:
+            pass
+
+
+_print_queue: Optional[PrintQueue] = None
+
+
+def get_print_queue() -> PrintQueue:
+    """File partagée par toutes les fenêtres de caisse (démarrée au premier appel)."""
+    global _print_queue
+    if _print_queue is None:
+        _print_queue = PrintQueue()
+        _print_queue.start()
+    return _print_queue
@@ -1,78 +1,107 @@
 import os
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional
 
 from PyQt5.QtWidgets import QMessageBox
 
-from database import get_conn
-from models import get_cafe_name
+from models import get_cafe_name, get_order
 
+# Un modèle de ticket reçoit le contexte (données de la commande + nom du
+# café) et renvoie le texte à imprimer.
+TicketTemplate = Callable[[Dict[str, Any]], str]
 
-def generate_and_print_ticket(order_id: int, parent: Optional[Any] = None) -> None:
-    conn = get_conn()
-    c = conn.cursor()
+_templates: Dict[str, TicketTemplate] = {}
 
-    c.execute(
-        """
-        SELECT o.id, o.total, o.date, u.username
-        FROM orders o
-        JOIN users u ON o.serveur_id = u.id
-        WHERE o.id=?
-        """,
-        (order_id,),
-    )
-    order = c.fetchone()
+DEFAULT_TEMPLATE = "standard"
 
-    if not order:
-        conn.close()
-        return
 
-    c.execute(
-        """
-        SELECT p.name, oi.qty, oi.price
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.id
-        WHERE oi.order_id=?
-        """,
-        (order_id,),
-    )
-    items = c.fetchall()
-    conn.close()
+def register_template(name: str, template: TicketTemplate) -> None:
+    _templates[name] = template
 
-    order_id_value, total, date_str, serveur_name = order
-    cafe_name = get_cafe_name()
 
+def standard_template(ctx: Dict[str, Any]) -> str:
     lines = []
-    lines.append(f"        {cafe_name}")
+    lines.append(f"        {ctx['cafe_name']}")
     lines.append("   Ticket de caisse officiel")
     lines.append("--------------------------------")
-    lines.append(f"Serveur : {serveur_name}")
-    lines.append(f"Date    : {date_str}")
-    lines.append(f"N° Cmd  : {order_id_value}")
+    lines.append(f"Serveur : {ctx['serveur']}")
+    lines.append(f"Date    : {ctx['date']}")
+    lines.append(f"N° Cmd  : {ctx['id']}")
     lines.append("--------------------------------")
 
-    for name, qty, price in items:
-        line_total = qty * price
-        lines.append(f"{name} x{qty}  {line_total:.2f} DH")
+    for it in ctx["items"]:
+        lines.append(f"{it['name']} x{it['qty']}  {it['total']} DH")
 
     lines.append("--------------------------------")
-    lines.append(f"TOTAL À PAYER : {total:.2f} DH")
+    lines.append(f"TOTAL À PAYER : {ctx['total']} DH")
     lines.append("--------------------------------")
     lines.append("Merci pour votre visite !")
     lines.append("À très bientôt.")
     lines.append("")
+    return "\n".join(lines)
+
+
+register_template(DEFAULT_TEMPLATE, standard_template)
+
+
+def render_ticket(order: Dict[str, Any], template: str = DEFAULT_TEMPLATE) -> str:
+    """Texte du ticket à partir d'une commande déjà en mémoire.
+
+    `order` a la forme renvoyée par models.create_order, complétée par le nom
+    du serveur ("serveur") : aucune relecture de la base n'est nécessaire.
+    Les commandes reçues du serveur de commandes portent déjà "cafe_name".
+    """
+    ctx = dict(order)
+    if "cafe_name" not in ctx:
+        ctx["cafe_name"] = get_cafe_name()
+    return _templates[template](ctx)
+
+
+def build_ticket_text(order_id: int, template: str = DEFAULT_TEMPLATE) -> Optional[str]:
+    """Réimpression : relit la commande dans la base puis la met en forme."""
+    order = get_order(order_id)
+    if order is None:
+        return None
+    return render_ticket(order, template)
 
-    ticket_text = "\n".join(lines)
-    ticket_name = f"ticket_{order_id_value}.txt"
 
+def write_ticket(order_id: int, ticket_text: str) -> str:
+    ticket_name = f"ticket_{order_id}.txt"
     with open(ticket_name, "w", encoding="utf-8") as f:
         f.write(ticket_text)
+    return ticket_name
 
+
+class PrintUnavailable(Exception):
+    """Impression automatique impossible sur ce poste (hors Windows)."""
+
+
+def print_ticket(ticket_name: str) -> None:
+    """Envoie le fichier à l'imprimante (Windows) ; lève une exception sinon."""
+    if not hasattr(os, "startfile"):
+        raise PrintUnavailable(ticket_name)
+    os.startfile(ticket_name, "print")  # type: ignore[attr-defined]
+
+
+def show_manual_print_notice(parent: Optional[Any], ticket_name: str) -> None:
+    QMessageBox.information(
+        parent,
+        "Ticket généré",
+        f"Ticket enregistré dans : {os.path.abspath(ticket_name)}\n"
+        "Vous pouvez l'imprimer manuellement.",
+    )
+
+
+def generate_and_print_ticket(
+    order_id: int,
+    parent: Optional[Any] = None,
+    ticket_text: Optional[str] = None,
+) -> None:
+    if ticket_text is None:
+        ticket_text = build_ticket_text(order_id)
+    if ticket_text is None:
+        return
+    ticket_name = write_ticket(order_id, ticket_text)
     try:
-        os.startfile(ticket_name, "print")
+        print_ticket(ticket_name)
     except Exception:
-        QMessageBox.information(
-            parent,
-            "Ticket généré",
-            f"Ticket enregistré dans : {os.path.abspath(ticket_name)}\n"
-            "Vous pouvez l'imprimer manuellement.",
-        )
+        show_manual_print_notice(parent, ticket_name)